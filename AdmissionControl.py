@@ -0,0 +1,304 @@
+# chat_backend/admission.py
+
+"""
+Admission control for upstream LLM calls.
+
+Each provider gets one AdmissionController that combines:
+    - a concurrency limit with a bounded, priority-ordered wait queue,
+    - a token-bucket rate limiter,
+    - retries with jittered exponential backoff on 429 and 5xx responses.
+
+When the queue is full, or a caller cannot be admitted before its deadline,
+AdmissionRejected is raised straight away so the API can answer "busy" with a
+Retry-After instead of piling more work onto a provider that is already
+rate limiting us.
+
+A slot is held until the SDK call's worker thread returns, even if the caller
+gave up earlier (a thread cannot be cancelled), so the limit bounds real
+upstream concurrency. Limits are per process: N uvicorn workers allow N times
+as many calls.
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call is shed instead of queued"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def upstream_status(exc: Exception) -> Optional[int]:
+    """HTTP status of a provider SDK error (OpenAI uses status_code, Google uses code)"""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def upstream_retry_after(exc: Exception) -> Optional[float]:
+    """Retry-After advertised by the provider, if the SDK exposes the response headers"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Classic token bucket; `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, deadline: Optional[float] = None):
+        """Take one token, waiting for a refill; raise TimeoutError if it would pass the deadline"""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise TimeoutError("rate limit wait exceeds deadline")
+            await asyncio.sleep(wait)
+
+
+class AdmissionController:
+    """Concurrency + rate limit + retry policy for one LLM provider"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        rate_per_sec: float = 0.0,
+        burst: Optional[float] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate_per_sec, burst or max(1.0, rate_per_sec)) if rate_per_sec > 0 else None
+
+        self._active = 0
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.retries = 0
+        self.abandoned = 0
+        self.max_depth = 0
+        self._wait_times: deque = deque(maxlen=1000)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def _estimate_retry_after(self) -> float:
+        if self._wait_times:
+            return max(1.0, 2 * sum(self._wait_times) / len(self._wait_times))
+        return 1.0
+
+    def _release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                # Hand the slot straight to the next waiter
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    def _release_when_done(self, work: asyncio.Future):
+        """Done callback for a call whose caller stopped waiting: free its slot now"""
+        if not work.cancelled():
+            work.exception()  # retrieved, so asyncio does not log it as unhandled
+        self._release()
+
+    async def _take_token(self, deadline: Optional[float]):
+        if self.bucket is None:
+            return
+        try:
+            await self.bucket.acquire(deadline)
+        except TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.name} rate limit", 1.0 / self.bucket.rate)
+
+    async def _acquire(self, priority: int, deadline: float):
+        if self._active < self.max_concurrency and not self.queue_depth:
+            self._active += 1
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"{self.name} queue is full ({self.max_queue} waiting)",
+                self._estimate_retry_after(),
+            )
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self.max_depth = max(self.max_depth, self.queue_depth)
+        try:
+            await asyncio.wait({fut}, timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()
+            else:
+                fut.cancel()
+            raise
+        if not fut.done():
+            fut.cancel()
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"timed out waiting for a {self.name} slot",
+                self._estimate_retry_after(),
+            )
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        advertised = upstream_retry_after(exc)
+        if advertised is not None:
+            delay = max(delay, advertised)
+        return delay
+
+    async def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        priority: int = 1,
+        deadline: Optional[float] = None,
+        **kwargs,
+    ) -> Any:
+        """Run the blocking SDK call `fn` in a worker thread once admitted.
+
+        Lower `priority` values are admitted first. `deadline` is a
+        time.monotonic() timestamp; admission never waits past it.
+        """
+        queue_deadline = time.monotonic() + self.queue_timeout
+        if deadline is not None:
+            queue_deadline = min(queue_deadline, deadline)
+
+        started = time.monotonic()
+        await self._acquire(priority, queue_deadline)
+        handed_off = False
+        try:
+            await self._take_token(queue_deadline)
+            self._wait_times.append(time.monotonic() - started)
+            self.admitted += 1
+
+            attempt = 0
+            while True:
+                # Like asyncio.to_thread, but the future outlives a cancelled caller
+                work = asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+                )
+                try:
+                    return await asyncio.shield(work)
+                except asyncio.CancelledError:
+                    if not work.done():
+                        # The thread is still talking to the provider: keep the slot until it returns
+                        work.add_done_callback(self._release_when_done)
+                        handed_off = True
+                        self.abandoned += 1
+                    raise
+                except Exception as e:
+                    status = upstream_status(e)
+                    if status not in RETRYABLE_STATUS:
+                        raise
+                    delay = self._backoff(attempt, e)
+                    out_of_time = deadline is not None and time.monotonic() + delay > deadline
+                    if attempt >= self.max_retries or out_of_time:
+                        if status == 429:
+                            raise AdmissionRejected(f"{self.name} is rate limiting requests", delay) from e
+                        raise
+                    self.retries += 1
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    # A retry is another upstream request, so it needs a token too
+                    await self._take_token(deadline)
+        finally:
+            if not handed_off:
+                self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight count and wait-time metrics"""
+        waits = sorted(self._wait_times)
+        return {
+            "in_flight": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth_seen": self.max_depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "abandoned": self.abandoned,
+            "wait_avg_ms": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+            "wait_max_ms": round(1000 * waits[-1], 2) if waits else 0.0,
+        }
+
+
+_controllers: Dict[str, AdmissionController] = {}
+
+
+def get_controller(provider: str) -> AdmissionController:
+    """Per-provider controller, configured from LLM_* environment variables"""
+    if provider not in _controllers:
+        _controllers[provider] = AdmissionController(
+            name=provider,
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.environ.get("LLM_MAX_QUEUE", "64")),
+            queue_timeout=float(os.environ.get("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+            rate_per_sec=float(os.environ.get("LLM_RATE_LIMIT_PER_SEC", "0")),
+            burst=float(os.environ["LLM_RATE_BURST"]) if os.environ.get("LLM_RATE_BURST") else None,
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", "3")),
+            backoff_base=float(os.environ.get("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+            backoff_max=float(os.environ.get("LLM_BACKOFF_MAX_SECONDS", "8")),
+        )
+    return _controllers[provider]
+
+
+def admission_stats() -> Dict[str, Any]:
+    """Stats for every provider that has made at least one call"""
+    return {name: controller.stats() for name, controller in _controllers.items()}
@@ -1,10 +1,16 @@
 # chat_backend/handler.py
 
+import asyncio
 import json
 import os
+import time
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-from MCPSample import SearchUsersInput, search_users_tool
+from MCPSample import TOOLS
+from ChatCache import ResponseCache, cache_from_env, make_cache_key
+from AdmissionControl import AdmissionRejected, get_controller
+import Metrics
+import Tracing
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +20,10 @@ llm_client = None
 llm_provider = None
 _initialized = False
 
+# Response cache is built on first use so .env settings are honoured
+_response_cache: Optional[ResponseCache] = None
+_cache_configured = False
+
 def initialize_llm():
     """Initialize LLM client based on available API keys"""
     global llm_client, llm_provider, _initialized
@@ -24,6 +34,15 @@ def initialize_llm():
     # Reload .env in case it wasn't loaded yet
     load_dotenv(override=True)
     
+    # Local scripted fake for offline load testing (no network, no key)
+    if os.environ.get("LLM_PROVIDER", "").lower() == "fake":
+        from FakeLLM import FakeLLMClient
+        llm_client = FakeLLMClient()
+        llm_provider = "fake"
+        _initialized = True
+        print("✓ Using fake LLM (LLM_PROVIDER=fake)")
+        return True
+    
     # Try Gemini first
     if os.environ.get("GEMINI_API_KEY"):
         try:
@@ -51,8 +70,43 @@ def initialize_llm():
     
     return False
 
-# Initialize on module load
-initialize_llm()
+LLM_REQUEST_SECONDS = Metrics.histogram(
+    "llm_request_duration_seconds",
+    "One LLM API round trip, including admission queueing and retries",
+    ("provider", "outcome"),
+)
+CHAT_TURN_SECONDS = Metrics.histogram(
+    "chat_turn_duration_seconds",
+    "Whole chat turn (LLM calls and tools), excluding cache hits",
+    ("provider", "outcome"),
+)
+CHAT_LLM_ROUND_TRIPS = Metrics.histogram(
+    "chat_llm_round_trips",
+    "LLM calls needed to answer one chat turn",
+    ("provider",),
+    buckets=(1, 2, 3, 4, 6, 8),
+)
+CHAT_CACHE_LOOKUPS = Metrics.counter(
+    "chat_cache_lookups_total",
+    "Chat response cache lookups",
+    ("result",),
+)
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the shared response cache, or None if CHAT_CACHE_ENABLED is off"""
+    global _response_cache, _cache_configured
+    if not _cache_configured:
+        _response_cache = cache_from_env()
+        _cache_configured = True
+    return _response_cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Cache statistics for the status endpoint"""
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    return cache.stats()
 
 # Tool schema for the LLM
 search_users_schema = {
@@ -86,14 +140,66 @@ search_users_schema = {
     }
 }
 
+get_users_by_ids_schema = {
+    "type": "function",
+    "function": {
+        "name": "get_users_by_ids",
+        "description": "Fetch users by id. Use this instead of search_users when the ids are already known.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "User ids to fetch (max 100)"
+                }
+            },
+            "required": ["ids"]
+        }
+    }
+}
 
-async def handle_chat(messages: List[Dict[str, str]], model: Optional[str] = None) -> Dict[str, Any]:
+count_users_schema = {
+    "type": "function",
+    "function": {
+        "name": "count_users",
+        "description": "Count users, in total and per role, without returning user records.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Only count users whose name or email contains this text"
+                },
+                "role": {
+                    "type": "string",
+                    "description": "Only count users with this role"
+                }
+            }
+        }
+    }
+}
+
+tool_schemas = [search_users_schema, get_users_by_ids_schema, count_users_schema]
+
+
+async def handle_chat(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    use_cache: bool = True,
+    data_generation: str = "",
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
     """
     Handle chat messages with tool calling support.
     
     Args:
         messages: List of chat messages with 'role' and 'content'
         model: Model to use (auto-selected if None)
+        use_cache: Set to False to bypass the response cache for this request
+        data_generation: Id of the dataset being served, so cached answers expire when data changes
+        deadline: time.monotonic() timestamp after which the turn is abandoned
+            and a partial/timeout response is returned
         
     Returns:
         Response from the LLM
@@ -106,20 +212,182 @@ async def handle_chat(messages: List[Dict[str, str]], model: Optional[str] = Non
         raise ValueError("No LLM configured. Set GEMINI_API_KEY or OPENAI_API_KEY environment variable.")
     
     if llm_provider == "gemini":
-        return await handle_chat_gemini(messages, model or "gemini-2.5-flash")
+        model = model or "gemini-2.5-flash"
+    elif llm_provider == "fake":
+        model = model or "fake-1"
+    else:
+        model = model or "gpt-4o-mini"
+    
+    with Tracing.span("chat.turn", provider=llm_provider, model=model) as turn_span:
+        return await _handle_chat_turn(messages, model, use_cache, data_generation, deadline, turn_span)
+
+
+async def _handle_chat_turn(
+    messages: List[Dict[str, str]],
+    model: str,
+    use_cache: bool,
+    data_generation: str,
+    deadline: Optional[float],
+    turn_span: Optional[Tracing.Span],
+) -> Dict[str, Any]:
+    """Cache lookup, then the provider-specific turn under the deadline"""
+    cache = get_response_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(messages, llm_provider, model, data_generation)
+        cached = await cache.get(cache_key)
+        CHAT_CACHE_LOOKUPS.inc("miss" if cached is None else "hit")
+        if cached is not None:
+            if turn_span is not None:
+                turn_span.set(cached=True)
+            cached["cached"] = True
+            return cached
+    
+    usage = {"llm_calls": 0, "tokens": 0, "tool_results": []}
+    started = time.perf_counter()
+    if llm_provider == "gemini":
+        turn = handle_chat_gemini(messages, model, usage, deadline)
     else:
-        return await handle_chat_openai(messages, model or "gpt-4o-mini")
+        # The fake provider mimics the OpenAI client, so it shares this path
+        turn = handle_chat_openai(messages, model, usage, deadline)
+    
+    outcome = "error"
+    try:
+        response = await asyncio.wait_for(turn, timeout=_remaining(deadline))
+        outcome = "ok"
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        return _timeout_response(usage)
+    finally:
+        CHAT_TURN_SECONDS.observe(time.perf_counter() - started, llm_provider, outcome)
+        CHAT_LLM_ROUND_TRIPS.observe(usage["llm_calls"], llm_provider)
+        if turn_span is not None:
+            turn_span.set(outcome=outcome, llm_calls=usage["llm_calls"], tokens=usage["tokens"])
+    
+    if cache is not None:
+        await cache.put(
+            cache_key,
+            response,
+            latency=time.perf_counter() - started,
+            llm_calls=usage["llm_calls"],
+            tokens=usage["tokens"],
+        )
+    return response
+
 
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before the deadline (None when there is no deadline)"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
 
-async def handle_chat_openai(messages: List[Dict[str, str]], model: str) -> Dict[str, Any]:
+
+def _timeout_kwargs(deadline: Optional[float]) -> Dict[str, Any]:
+    """Per-call SDK timeout, so the worker thread gives up once the deadline passes"""
+    remaining = _remaining(deadline)
+    if remaining is None:
+        return {}
+    if llm_provider == "gemini":
+        return {"request_options": {"timeout": remaining}}
+    return {"timeout": remaining}
+
+
+def _timeout_response(usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Best answer we can give when the deadline passes mid-turn"""
+    results = usage["tool_results"]
+    if not results:
+        return {
+            "error": "The request took too long and was cancelled.",
+            "content": "Sorry, that took too long. Please try again.",
+            "role": "assistant",
+            "tool_called": False,
+            "finish_reason": "timeout",
+            "timed_out": True
+        }
+    # The search finished but the final LLM call did not: return the raw results
+    found = "; ".join(
+        r["summary"] + (": " + ", ".join(u["name"] for u in r["users"]) if r.get("users") else "")
+        for r in results
+    )
+    return {
+        "content": f"I ran out of time before writing a full answer. Search results: {found}",
+        "role": "assistant",
+        "tool_called": True,
+        "finish_reason": "timeout",
+        "timed_out": True
+    }
+
+
+async def _call_llm(fn, *args, priority: int = 1, deadline: Optional[float] = None, **kwargs):
+    """Run a blocking SDK call through the provider's admission controller.
+
+    Follow-up calls for a turn that is already in progress use priority 0 so
+    they are admitted ahead of brand new conversations.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with Tracing.span("llm.call", provider=llm_provider, priority=priority):
+            result = await get_controller(llm_provider).call(
+                fn, *args, priority=priority, deadline=deadline, **kwargs
+            )
+        outcome = "ok"
+        return result
+    except (asyncio.TimeoutError, TimeoutError):
+        outcome = "timeout"
+        raise
+    except AdmissionRejected:
+        outcome = "rejected"
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, llm_provider, outcome)
+
+
+async def _execute_tool(
+    tool_name: str,
+    tool_args: Dict[str, Any],
+    usage: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """Run one tool call requested by the LLM (None if the tool is unknown)"""
+    if tool_name not in TOOLS:
+        return None
+    input_model, tool_fn = TOOLS[tool_name]
+    result = await tool_fn(
+        input_model(**tool_args),
+        timeout=_remaining(deadline)
+    )
+    if usage is not None:
+        usage["tool_results"].append(result)
+    return result
+
+
+def _record_usage(usage: Optional[Dict[str, Any]], tokens: Optional[int]):
+    """Count one LLM round trip (and its tokens, when the provider reports them)"""
+    if usage is None:
+        return
+    usage["llm_calls"] += 1
+    usage["tokens"] += tokens or 0
+
+
+async def handle_chat_openai(
+    messages: List[Dict[str, str]],
+    model: str,
+    usage: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
     """Handle chat with OpenAI"""
     # First call to LLM with tools available
-    response = llm_client.chat.completions.create(
+    response = await _call_llm(
+        llm_client.chat.completions.create,
         model=model,
         messages=messages,
-        tools=[search_users_schema],
-        tool_choice="auto"
+        tools=tool_schemas,
+        tool_choice="auto",
+        deadline=deadline,
+        **_timeout_kwargs(deadline)
     )
+    _record_usage(usage, getattr(response.usage, "total_tokens", None))
 
     message = response.choices[0].message
     
@@ -147,12 +415,9 @@ async def handle_chat_openai(messages: List[Dict[str, str]], model: str) -> Dict
             tool_name = tool_call.function.name
             tool_args = json.loads(tool_call.function.arguments)
             
-            if tool_name == "search_users":
-                # Call the actual tool
-                result = await search_users_tool(
-                    SearchUsersInput(**tool_args)
-                )
-                
+            # Call the actual tool
+            result = await _execute_tool(tool_name, tool_args, usage, deadline)
+            if result is not None:
                 # Add tool result to conversation
                 messages.append({
                     "role": "tool",
@@ -162,10 +427,15 @@ async def handle_chat_openai(messages: List[Dict[str, str]], model: str) -> Dict
                 })
         
         # Make second call to LLM with tool results
-        final_response = llm_client.chat.completions.create(
+        final_response = await _call_llm(
+            llm_client.chat.completions.create,
             model=model,
-            messages=messages
+            messages=messages,
+            priority=0,
+            deadline=deadline,
+            **_timeout_kwargs(deadline)
         )
+        _record_usage(usage, getattr(final_response.usage, "total_tokens", None))
         
         return {
             "content": final_response.choices[0].message.content,
@@ -183,7 +453,12 @@ async def handle_chat_openai(messages: List[Dict[str, str]], model: str) -> Dict
     }
 
 
-async def handle_chat_gemini(messages: List[Dict[str, str]], model: str) -> Dict[str, Any]:
+async def handle_chat_gemini(
+    messages: List[Dict[str, str]],
+    model: str,
+    usage: Optional[Dict[str, Any]] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
     """Handle chat with Google Gemini"""
     # Convert messages to Gemini format
     gemini_messages = []
@@ -220,6 +495,38 @@ async def handle_chat_gemini(messages: List[Dict[str, str]], model: str) -> Dict
                         ),
                     }
                 )
+            ),
+            llm_client.protos.FunctionDeclaration(
+                name="get_users_by_ids",
+                description="Fetch users by id. Use this instead of search_users when the ids are already known.",
+                parameters=llm_client.protos.Schema(
+                    type=llm_client.protos.Type.OBJECT,
+                    properties={
+                        "ids": llm_client.protos.Schema(
+                            type=llm_client.protos.Type.ARRAY,
+                            items=llm_client.protos.Schema(type=llm_client.protos.Type.STRING),
+                            description="User ids to fetch (max 100)"
+                        ),
+                    },
+                    required=["ids"]
+                )
+            ),
+            llm_client.protos.FunctionDeclaration(
+                name="count_users",
+                description="Count users, in total and per role, without returning user records.",
+                parameters=llm_client.protos.Schema(
+                    type=llm_client.protos.Type.OBJECT,
+                    properties={
+                        "query": llm_client.protos.Schema(
+                            type=llm_client.protos.Type.STRING,
+                            description="Only count users whose name or email contains this text"
+                        ),
+                        "role": llm_client.protos.Schema(
+                            type=llm_client.protos.Type.STRING,
+                            description="Only count users with this role"
+                        ),
+                    }
+                )
             )
         ]
     )
@@ -236,20 +543,30 @@ async def handle_chat_gemini(messages: List[Dict[str, str]], model: str) -> Dict
     
     # Send the last message
     last_message = gemini_messages[-1]["parts"][0] if gemini_messages else ""
-    response = chat.send_message(last_message)
+    response = await _call_llm(
+        chat.send_message,
+        last_message,
+        deadline=deadline,
+        **_timeout_kwargs(deadline)
+    )
+    _record_usage(usage, getattr(response.usage_metadata, "total_token_count", None))
     
     # Check for function calls
     if response.candidates[0].content.parts[0].function_call:
         function_call = response.candidates[0].content.parts[0].function_call
         tool_name = function_call.name
-        tool_args = dict(function_call.args)
+        # Repeated proto fields (e.g. ids) come back as proto containers, not lists
+        tool_args = {
+            key: list(value) if not isinstance(value, (str, int, float, bool)) else value
+            for key, value in function_call.args.items()
+        }
         
         # Execute the tool
-        if tool_name == "search_users":
-            result = await search_users_tool(SearchUsersInput(**tool_args))
-            
+        result = await _execute_tool(tool_name, tool_args, usage, deadline)
+        if result is not None:
             # Send result back to model
-            response = chat.send_message(
+            response = await _call_llm(
+                chat.send_message,
                 llm_client.protos.Content(
                     parts=[llm_client.protos.Part(
                         function_response=llm_client.protos.FunctionResponse(
@@ -257,8 +574,12 @@ async def handle_chat_gemini(messages: List[Dict[str, str]], model: str) -> Dict
                             response={"result": result}
                         )
                     )]
-                )
+                ),
+                priority=0,
+                deadline=deadline,
+                **_timeout_kwargs(deadline)
             )
+            _record_usage(usage, getattr(response.usage_metadata, "total_token_count", None))
             
             return {
                 "content": response.text,
@@ -278,6 +599,7 @@ async def handle_chat_gemini(messages: List[Dict[str, str]], model: str) -> Dict
 
 async def main():
     """Example usage of the chat handler"""
+    initialize_llm()
     print("Chat Backend Example")
     print("=" * 50)
     print(f"Using: {llm_provider or 'No LLM configured'}")
@@ -0,0 +1,205 @@
+# chat_backend/cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+# Expired rows are deleted from the disk tier at most this often (and at startup)
+PURGE_INTERVAL_SECONDS = 60.0
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Reduce messages to the parts that affect the answer.
+
+    Roles are lower-cased and content is case-folded with whitespace collapsed,
+    so "Show me all  admins" and "show me all admins" share a cache entry.
+    """
+    normalized = []
+    for msg in messages:
+        content = msg.get("content") or ""
+        normalized.append({
+            "role": str(msg.get("role", "")).strip().lower(),
+            "content": " ".join(str(content).split()).casefold(),
+        })
+    return normalized
+
+
+def make_cache_key(
+    messages: List[Dict[str, Any]],
+    provider: Optional[str],
+    model: Optional[str],
+    data_generation: str = "",
+) -> str:
+    """Hash the normalized conversation together with everything else that changes the answer"""
+    payload = json.dumps(
+        {
+            "messages": normalize_messages(messages),
+            "provider": provider,
+            "model": model,
+            "data_generation": data_generation,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache for chat completions.
+
+    The memory tier is an LRU bounded by `max_entries`; the optional disk tier is
+    a SQLite file that survives restarts. Both tiers honour the same TTL;
+    expired rows are deleted from the file, so it does not grow without bound.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 300.0,
+        db_path: Optional[str] = None,
+        cost_per_1k_tokens: float = 0.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        self.llm_calls_saved = 0
+        self.tokens_saved = 0
+        self.expired_purged = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS chat_cache_created_at ON chat_cache(created_at)")
+            self._db.commit()
+            self._disk_purge()
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT value, created_at FROM chat_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        entry = json.loads(row[0])
+        entry["created_at"] = row[1]
+        return entry
+
+    def _disk_put(self, key: str, entry: Dict[str, Any]):
+        value = {k: v for k, v in entry.items() if k != "created_at"}
+        self._db.execute(
+            "INSERT OR REPLACE INTO chat_cache (key, value, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), entry["created_at"]),
+        )
+        self._db.commit()
+        if time.time() - self._last_purge >= min(self.ttl_seconds, PURGE_INTERVAL_SECONDS):
+            self._disk_purge()
+
+    def _disk_purge(self):
+        """Delete the rows whose TTL has passed"""
+        self._last_purge = time.time()
+        deleted = self._db.execute(
+            "DELETE FROM chat_cache WHERE created_at < ?", (self._last_purge - self.ttl_seconds,)
+        ).rowcount
+        self._db.commit()
+        self.expired_purged += deleted
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response, or None on a miss"""
+        entry = self._memory.get(key)
+        if entry is not None and self._expired(entry):
+            del self._memory[key]
+            entry = None
+
+        if entry is None and self._db is not None:
+            entry = await asyncio.to_thread(self._disk_get, key)
+            if entry is not None and self._expired(entry):
+                entry = None
+            elif entry is not None:
+                self.disk_hits += 1
+                self._remember(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._memory.move_to_end(key)
+        self.hits += 1
+        self.latency_saved += entry["latency"]
+        self.llm_calls_saved += entry["llm_calls"]
+        self.tokens_saved += entry["tokens"]
+        return dict(entry["response"])
+
+    async def put(self, key: str, response: Dict[str, Any], latency: float, llm_calls: int, tokens: int = 0):
+        """Store a freshly computed response with the cost it took to produce"""
+        entry = {
+            "response": response,
+            "latency": latency,
+            "llm_calls": llm_calls,
+            "tokens": tokens,
+            "created_at": time.time(),
+        }
+        self._remember(key, entry)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, entry)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM chat_cache")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and the latency/cost avoided so far"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": len(self._memory),
+            "disk_enabled": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "llm_calls_saved": self.llm_calls_saved,
+            "tokens_saved": self.tokens_saved,
+            "disk_expired_purged": self.expired_purged,
+            "estimated_cost_saved_usd": round(self.tokens_saved / 1000 * self.cost_per_1k_tokens, 6),
+        }
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """Build the cache from CHAT_CACHE_* environment variables (None when disabled)"""
+    if os.environ.get("CHAT_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return ResponseCache(
+        max_entries=int(os.environ.get("CHAT_CACHE_MAX_ENTRIES", "256")),
+        ttl_seconds=float(os.environ.get("CHAT_CACHE_TTL_SECONDS", "300")),
+        db_path=os.environ.get("CHAT_CACHE_DB") or None,
+        cost_per_1k_tokens=float(os.environ.get("CHAT_COST_PER_1K_TOKENS", "0")),
+    )
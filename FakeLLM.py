@@ -0,0 +1,214 @@
+# chat_backend/fake_llm.py
+
+"""
+Deterministic stand-in for the OpenAI client, for offline load testing.
+
+The fake answers by rule instead of by model: "how many ..." becomes a
+`count_users` call, a message naming user ids (u1, u2) becomes
+`get_users_by_ids`, anything else that looks like a user search becomes
+`search_users`; a tool result becomes a short summary, and everything else is
+echoed back. It mimics the subset of the OpenAI SDK
+that ChatBackend uses (`client.chat.completions.create`, including
+`stream=True`), so the real chat -> tool -> search path is exercised.
+
+Configuration:
+    FAKE_LLM_LATENCY_MS      - fixed delay per call (default 50)
+    FAKE_LLM_TOKENS_PER_SEC  - output rate; 0 means emit instantly (default 0)
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any, Iterator, Optional
+
+SEARCH_WORDS = ("user", "users", "admin", "admins", "member", "members", "find", "search", "who", "list", "show")
+
+
+def _count_tokens(text: str) -> int:
+    """Rough token count: one per word"""
+    return len(text.split()) if text else 0
+
+
+def _call_id(messages: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha1(json.dumps(messages, sort_keys=True, default=str).encode("utf-8"))
+    return "call_" + digest.hexdigest()[:12]
+
+
+def plan_search(text: str) -> Optional[Dict[str, Any]]:
+    """Return search_users arguments if the text reads like a user search, else None"""
+    lowered = text.lower()
+    words = set(re.findall(r"[a-z]+", lowered))
+    if not words & set(SEARCH_WORDS):
+        return None
+
+    args: Dict[str, Any] = {}
+    if "admin" in lowered:
+        args["role"] = "admin"
+    elif "member" in lowered:
+        args["role"] = "member"
+
+    quoted = re.search(r"[\"']([^\"']+)[\"']", text)
+    named = re.search(r"\b(?:named|called|matching|with email)\s+([\w.@-]+)", text, re.IGNORECASE)
+    email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", text)
+    if quoted:
+        args["query"] = quoted.group(1)
+    elif email:
+        args["query"] = email.group(0)
+    elif named:
+        args["query"] = named.group(1)
+
+    top = re.search(r"\b(?:top|first|limit)\s+(\d+)", lowered)
+    if top:
+        args["limit"] = min(int(top.group(1)), 100)
+    return args
+
+
+def plan_tool_call(text: str, tool_names: set) -> Optional[tuple]:
+    """Pick (tool name, arguments) for a user message, or None to answer in text"""
+    lowered = text.lower()
+    if "count_users" in tool_names and re.search(r"\b(how many|count|number of)\b", lowered):
+        args: Dict[str, Any] = {}
+        if "admin" in lowered:
+            args["role"] = "admin"
+        elif "member" in lowered:
+            args["role"] = "member"
+        return "count_users", args
+
+    ids = re.findall(r"\bu\d+\b", lowered)
+    if "get_users_by_ids" in tool_names and ids:
+        return "get_users_by_ids", {"ids": ids}
+
+    if "search_users" in tool_names:
+        args = plan_search(text)
+        if args is not None:
+            return "search_users", args
+    return None
+
+
+def summarize_tool_result(content: str) -> str:
+    """Turn a tool result into a one-paragraph answer"""
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return "The search tool returned an unreadable result."
+    if "users" not in result:
+        return f"There are {result.get('summary', 'no users')}."
+    users = result.get("users", [])
+    if not users:
+        return "I couldn't find any matching users."
+    names = ", ".join(f"{u['name']} ({u['role']})" for u in users)
+    return f"{result.get('summary', 'Found users')}. Showing {len(users)}: {names}."
+
+
+class _Completions:
+    def __init__(self, latency_ms: float, tokens_per_sec: float):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+
+    def _decide(self, messages: List[Dict[str, Any]], tools: Optional[list]):
+        """Return (text, tool_call) for the next assistant turn"""
+        last = messages[-1] if messages else {"role": "user", "content": ""}
+        if last.get("role") == "tool":
+            return summarize_tool_result(last.get("content")), None
+
+        text = last.get("content") or ""
+        tool_names = {t["function"]["name"] for t in tools or []}
+        planned = plan_tool_call(text, tool_names)
+        if planned is not None:
+            name, args = planned
+            tool_call = SimpleNamespace(
+                id=_call_id(messages),
+                type="function",
+                function=SimpleNamespace(name=name, arguments=json.dumps(args)),
+            )
+            return None, tool_call
+        return f"You said: {text}", None
+
+    def _usage(self, messages: List[Dict[str, Any]], text: Optional[str]):
+        prompt = sum(_count_tokens(str(m.get("content") or "")) for m in messages)
+        completion = _count_tokens(text or "")
+        return SimpleNamespace(
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            total_tokens=prompt + completion,
+        )
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def create(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        tools: Optional[list] = None,
+        tool_choice: Optional[str] = None,
+        stream: bool = False,
+        **kwargs,
+    ):
+        """Mimic `OpenAI().chat.completions.create`, including its per-call `timeout`"""
+        text, tool_call = self._decide(messages, tools)
+        timeout = kwargs.get("timeout")
+        delay = self.latency_ms / 1000
+        if not stream:
+            delay += self._token_delay() * _count_tokens(text or "")
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake LLM call exceeded timeout of {timeout:.3f}s")
+        if stream:
+            time.sleep(delay)
+            return self._stream(model, text, tool_call)
+
+        time.sleep(delay)
+        message = SimpleNamespace(
+            role="assistant",
+            content=text,
+            tool_calls=[tool_call] if tool_call else None,
+        )
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                message=message,
+                finish_reason="tool_calls" if tool_call else "stop",
+            )],
+            usage=self._usage(messages, text),
+        )
+
+    def _stream(self, model: str, text: Optional[str], tool_call) -> Iterator[SimpleNamespace]:
+        """Yield OpenAI-style chunks, one word at a time, at the configured token rate"""
+        def chunk(delta, finish_reason=None):
+            return SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason)],
+            )
+
+        if tool_call:
+            yield chunk(SimpleNamespace(content=None, tool_calls=[SimpleNamespace(
+                index=0,
+                id=tool_call.id,
+                type="function",
+                function=tool_call.function,
+            )]))
+            yield chunk(SimpleNamespace(content=None, tool_calls=None), "tool_calls")
+            return
+
+        delay = self._token_delay()
+        for i, word in enumerate((text or "").split(" ")):
+            if delay:
+                time.sleep(delay)
+            yield chunk(SimpleNamespace(content=word if i == 0 else " " + word, tool_calls=None))
+        yield chunk(SimpleNamespace(content=None, tool_calls=None), "stop")
+
+
+class FakeLLMClient:
+    """Drop-in replacement for `openai.OpenAI()` as used by ChatBackend"""
+
+    def __init__(self, latency_ms: Optional[float] = None, tokens_per_sec: Optional[float] = None):
+        if latency_ms is None:
+            latency_ms = float(os.environ.get("FAKE_LLM_LATENCY_MS", "50"))
+        if tokens_per_sec is None:
+            tokens_per_sec = float(os.environ.get("FAKE_LLM_TOKENS_PER_SEC", "0"))
+        self.chat = SimpleNamespace(completions=_Completions(latency_ms, tokens_per_sec))
@@ -1,17 +1,160 @@
 # data_api/main.py
 
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import os
+import sys
+import time
+import asyncio
+import contextlib
+import hashlib
 from dotenv import load_dotenv
+from AdmissionControl import AdmissionRejected, admission_stats
+from UserStore import UserStore, store_from_env
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
+# These read their settings at import time, so they come after .env is loaded
+import Metrics
+import Profiling
+import Tracing
+
+# "eager" warms everything up before serving; "lazy" leaves it all to the first request that needs it
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "eager").lower()
+
+# Milliseconds spent in each warm-up phase, reported on /api/status
+STARTUP_TIMINGS: Dict[str, float] = {}
+
+@contextlib.contextmanager
+def _startup_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = round(1000 * (time.perf_counter() - started), 2)
+
+def warm_up():
+    """Pay the one-off costs now instead of on the first chat/lookup request"""
+    with _startup_phase("import_chat_backend"):
+        import ChatBackend
+    with _startup_phase("llm_client"):
+        # Imports the provider SDK and constructs its client
+        ChatBackend.initialize_llm()
+    with _startup_phase("chat_cache"):
+        ChatBackend.get_response_cache()
+    with _startup_phase("user_store"):
+        get_store().warm_up()
+
+async def _preopen_connections(attempts: int = 20):
+    """Open the tool's keep-alive connection to the data API once we are serving"""
+    import MCPSample
+    started = time.perf_counter()
+    for _ in range(attempts):
+        try:
+            await MCPSample.get_http_client().get("/api/", timeout=1)
+            STARTUP_TIMINGS["preopen_connection"] = round(1000 * (time.perf_counter() - started), 2)
+            return
+        except Exception:
+            # The server only starts listening after the lifespan startup completes
+            await asyncio.sleep(0.1)
+
+def load_users(users, source: Optional[str] = None) -> int:
+    """Replace the user store contents (e.g. with a synthetic dataset); returns the new size"""
+    return get_store().load(users, source)
+
+def _load_dataset_from_env():
+    """USERS_FILE=path.jsonl or SYNTHETIC_USERS=N (with SYNTHETIC_SEED) replaces the mock users"""
+    users_file = os.environ.get("USERS_FILE")
+    synthetic = int(os.environ.get("SYNTHETIC_USERS", "0"))
+    if not users_file and not synthetic:
+        return
+    from benchmarks.dataset import generate_users, read_users
+    with _startup_phase("load_users"):
+        # `source` lets a persistent store skip reloading a dataset it already holds
+        if users_file:
+            info = os.stat(users_file)
+            source = f"file:{os.path.abspath(users_file)}:{info.st_size}:{info.st_mtime_ns}"
+            count = load_users(read_users(users_file), source)
+        else:
+            seed = int(os.environ.get("SYNTHETIC_SEED", "42"))
+            count = load_users(generate_users(synthetic, seed), f"synthetic:{synthetic}:{seed}")
+    print(f"✓ Loaded {count} users")
+
+# True between the end of startup (dataset loaded, warm-up done) and the start of shutdown
+READY = False
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    global READY, _store
+    preopen = None
+    # Opening the store (schema, seed) is blocking I/O, so it happens here in both
+    # modes rather than on the event loop inside the first request; lazy only defers warm-up
+    get_store()
+    _load_dataset_from_env()
+    if STARTUP_MODE == "eager":
+        with _startup_phase("total"):
+            warm_up()
+        preopen = asyncio.create_task(_preopen_connections())
+    READY = True
+    yield
+    READY = False
+    if preopen is not None:
+        preopen.cancel()
+    if "MCPSample" in sys.modules:
+        await sys.modules["MCPSample"].close_http_client()
+    if _store is not None:
+        await _store.close()
+        _store = None
+
+HTTP_REQUEST_SECONDS = Metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+SEARCH_STAGE_SECONDS = Metrics.histogram(
+    "search_stage_duration_seconds",
+    "Time spent in each stage of a user search",
+    ("stage",),
+)
+
+def _observe_search_stages(stages: Dict[str, float], elapsed: float):
+    """Record the store's own stages, plus "wait" for the rest of `elapsed` (e.g. thread-pool queueing)"""
+    for stage, seconds in stages.items():
+        SEARCH_STAGE_SECONDS.observe(seconds, stage)
+    SEARCH_STAGE_SECONDS.observe(max(0.0, elapsed - sum(stages.values())), "wait")
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request (cheaper than BaseHTTPMiddleware)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; use its template to keep cardinality low
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], route, str(status[0]))
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(Tracing.TracingMiddleware)
+app.add_middleware(Profiling.ProfilingMiddleware, paths=("/users/search", "/api/chat"))
 
 # Mount static files directory
 if os.path.exists("static"):
@@ -28,6 +171,26 @@ class UserSearchResponse(BaseModel):
     total: int
     items: List[User]
 
+class UserSearchQuery(BaseModel):
+    query: Optional[str] = None
+    role: Optional[str] = None
+    limit: int = Field(10, le=100)
+    offset: int = 0
+
+class BatchSearchRequest(BaseModel):
+    searches: List[UserSearchQuery] = Field(..., max_length=256)
+
+class BatchSearchResponse(BaseModel):
+    results: List[UserSearchResponse]
+
+class UsersByIdsResponse(BaseModel):
+    items: List[User]
+    missing: List[str]
+
+class UserCountResponse(BaseModel):
+    total: int
+    by_role: Dict[str, int]
+
 # Mock database
 MOCK_USERS = [
     {
@@ -60,6 +223,38 @@ MOCK_USERS = [
     }
 ]
 
+# Max ids accepted by /users/by_ids in one call
+MAX_IDS_PER_LOOKUP = 100
+
+# USER_STORE=memory (serves MOCK_USERS) or sqlite (USER_STORE_PATH, seeded with MOCK_USERS when empty)
+_store: Optional[UserStore] = None
+
+def get_store() -> UserStore:
+    """The user store, opened during startup (see `lifespan`), or on first use outside the server"""
+    global _store
+    if _store is None:
+        _store = store_from_env(MOCK_USERS)
+    return _store
+
+def data_generation() -> str:
+    """Short id of the dataset being served, so cached chat answers are not reused across datasets.
+
+    Derived from the store's `source` (or content hash), not a counter, so it
+    stays valid for the persistent cache tier across restarts.
+    """
+    return hashlib.sha256((get_store().source or "").encode("utf-8")).hexdigest()[:16]
+
+async def _search(query: Optional[str], role: Optional[str], limit: int, offset: int) -> Dict[str, Any]:
+    """Filter and paginate through the user store; traced, with the store's stages timed"""
+    with Tracing.span("search", role=role, limit=limit, offset=offset) as search_span:
+        stages: Dict[str, float] = {}
+        started = time.perf_counter()
+        result = await get_store().search(query, role, limit, offset, stages)
+        _observe_search_stages(stages, time.perf_counter() - started)
+        if search_span is not None:
+            search_span.set(total=result["total"])
+    return result
+
 @app.get("/users/search", response_model=UserSearchResponse)
 async def search_users(
     query: Optional[str] = None,
@@ -68,32 +263,101 @@ async def search_users(
     offset: int = 0,
 ):
     """Search users with optional filtering by name/email and role"""
-    filtered_users = MOCK_USERS[:]
-    
-    # Filter by query (search in name and email)
-    if query:
-        query_lower = query.lower()
-        filtered_users = [
-            u for u in filtered_users
-            if query_lower in u["name"].lower() or query_lower in u["email"].lower()
-        ]
-    
-    # Filter by role
-    if role:
-        filtered_users = [u for u in filtered_users if u["role"] == role]
+    result = await _search(query, role, limit, offset)
     
-    # Apply pagination
-    total = len(filtered_users)
-    paginated_users = filtered_users[offset:offset + limit]
+    # Serialize here rather than in FastAPI so the stage can be timed (and validated only once)
+    started = time.perf_counter()
+    body = UserSearchResponse.model_validate(result).model_dump_json()
+    SEARCH_STAGE_SECONDS.observe(time.perf_counter() - started, "serialize")
+    return Response(content=body, media_type="application/json")
+
+@app.post("/users/search/batch", response_model=BatchSearchResponse)
+async def search_users_batch(request: BatchSearchRequest):
+    """Run several searches in one round trip (used by the MCP tool's micro-batcher)"""
+    with Tracing.span("search_many", searches=len(request.searches)):
+        stages: Dict[str, float] = {}
+        started = time.perf_counter()
+        results = await get_store().search_many(
+            [(s.query, s.role, s.limit, s.offset) for s in request.searches], stages
+        )
+        _observe_search_stages(stages, time.perf_counter() - started)
+    return {"results": results}
+
+@app.get("/users/by_ids", response_model=UsersByIdsResponse)
+async def get_users_by_ids(ids: List[str] = Query(...)):
+    """Look up users by primary key (repeat `ids`, or pass a comma-separated list)"""
+    requested = [i.strip() for chunk in ids for i in chunk.split(",") if i.strip()]
+    if len(requested) > MAX_IDS_PER_LOOKUP:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_IDS_PER_LOOKUP} ids per request")
     
+    users_by_id = await get_store().get_by_ids(requested)
+    items = [users_by_id[i] for i in requested if i in users_by_id]
+    missing = [i for i in requested if i not in users_by_id]
+    return {"items": items, "missing": missing}
+
+@app.get("/users/count", response_model=UserCountResponse)
+async def count_users(query: Optional[str] = None, role: Optional[str] = None):
+    """Total and per-role user counts, without returning any user records"""
+    by_role = await get_store().count(query, role)
+    return {"total": sum(by_role.values()), "by_role": by_role}
+
+@app.get("/readyz")
+async def readyz():
+    """Cheap readiness probe for supervisors and load balancers"""
+    if not READY:
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (text exposition format)"""
+    return Response(content=Metrics.render(), media_type=Metrics.CONTENT_TYPE)
+
+def _require_profile_token(request: Request):
+    """Profiling endpoints are hidden unless PROFILE_TOKEN is set, and need that token"""
+    if not Profiling.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("X-Profile-Token")
+    if not Profiling.check_token(token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+@app.get("/api/profiles")
+async def list_profiles(request: Request):
+    """Slowest recorded requests with stack samples, and the saved per-request profiles"""
+    _require_profile_token(request)
+    sampler = Profiling.get_sampler()
+    files = sorted(os.listdir(Profiling.PROFILE_DIR)) if os.path.isdir(Profiling.PROFILE_DIR) else []
     return {
-        "total": total,
-        "items": paginated_users
+        "sampler": sampler.stats() if sampler else {"enabled": False},
+        "slowest": sampler.slowest() if sampler else [],
+        "files": [name for name in files if name.endswith(".prof")],
     }
 
+@app.get("/api/profiles/{name}", response_class=PlainTextResponse)
+async def get_profile(
+    name: str,
+    request: Request,
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(40, ge=1, le=500),
+):
+    """Text report (pstats) for one saved profile"""
+    _require_profile_token(request)
+    path = Profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Profiling.profile_summary(path, sort, limit)
+
+@app.get("/api/traces")
+async def get_traces(
+    trace_id: Optional[str] = Query(None, pattern="^[0-9a-f]{32}$"),
+    limit: int = Query(1000, ge=1, le=Tracing.TRACE_BUFFER_SIZE),
+):
+    """Recently finished spans as OTLP/JSON (one trace with trace_id, else the newest `limit`)"""
+    return Tracing.export_otlp(trace_id, None if trace_id else limit)
+
 @app.get("/api/")
 async def api_root():
-    return {"message": "User Data API", "endpoints": ["/users/search", "/api/chat", "/api/status"]}
+    return {"message": "User Data API", "endpoints": ["/users/search", "/users/search/batch", "/users/by_ids", "/users/count", "/api/chat", "/api/status", "/api/traces", "/metrics"]}
 
 @app.get("/")
 async def serve_frontend():
@@ -107,34 +371,89 @@ async def get_status():
     """Check system status"""
     gemini_available = bool(os.environ.get("GEMINI_API_KEY"))
     openai_available = bool(os.environ.get("OPENAI_API_KEY"))
-    llm_available = gemini_available or openai_available
+    fake_llm = os.environ.get("LLM_PROVIDER", "").lower() == "fake"
+    llm_available = gemini_available or openai_available or fake_llm
+    
+    if fake_llm:
+        llm_provider = "Fake"
+    else:
+        llm_provider = "Gemini" if gemini_available else ("OpenAI" if openai_available else "None")
     
-    llm_provider = "Gemini" if gemini_available else ("OpenAI" if openai_available else "None")
+    # Only report cache stats if the chat backend has been loaded; don't import LLM SDKs here
+    chat_backend = sys.modules.get("ChatBackend")
+    chat_cache = chat_backend.cache_stats() if chat_backend else {"enabled": False, "loaded": False}
+    mcp_tools = sys.modules.get("MCPSample")
+    search_batching = mcp_tools.search_batch_stats() if mcp_tools else {"loaded": False}
     
     return {
         "status": "online",
         "api_version": "1.0",
         "llm_available": llm_available,
         "llm_provider": llm_provider,
+        "chat_cache": chat_cache,
+        "llm_admission": admission_stats(),
+        "search_batching": search_batching,
+        "chat_outcomes": CHAT_OUTCOMES,
+        "startup": {"mode": STARTUP_MODE, "timings_ms": STARTUP_TIMINGS},
+        "users": await get_store().size(),
+        "user_store": get_store().stats(),
+        "data_generation": data_generation(),
         "endpoints": {
             "search": "/users/search",
+            "search_batch": "/users/search/batch",
+            "by_ids": "/users/by_ids",
+            "count": "/users/count",
             "chat": "/api/chat",
-            "status": "/api/status"
+            "status": "/api/status",
+            "traces": "/api/traces",
+            "metrics": "/metrics"
         }
     }
 
 class ChatRequest(BaseModel):
     messages: List[Dict[str, str]]
+    cache: bool = True  # set to false to skip the response cache for this request
+    timeout: Optional[float] = Field(None, gt=0, le=300)  # seconds; defaults to CHAT_DEADLINE_SECONDS
+    timings: bool = False  # set to true to get a per-hop latency breakdown in the response
+
+# Default end-to-end budget for one chat turn
+CHAT_DEADLINE_SECONDS = float(os.environ.get("CHAT_DEADLINE_SECONDS", "30"))
+
+# How often a running chat turn checks whether the browser went away
+DISCONNECT_POLL_SECONDS = 0.25
+
+# Outcome counters, so wasted work (timeouts, abandoned turns) is visible on /api/status
+CHAT_OUTCOMES = {"completed": 0, "timed_out": 0, "disconnected": 0, "busy": 0, "failed": 0}
+
+class ClientDisconnected(Exception):
+    """The client went away before the chat turn finished"""
+
+async def _run_unless_disconnected(http_request: Request, coro):
+    """Await `coro`, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
 
 @app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """Handle chat requests with LLM integration"""
+    deadline = time.monotonic() + (request.timeout or CHAT_DEADLINE_SECONDS)
     try:
         # Check if any LLM API key is set
         gemini_key = os.environ.get("GEMINI_API_KEY")
         openai_key = os.environ.get("OPENAI_API_KEY")
+        fake_llm = os.environ.get("LLM_PROVIDER", "").lower() == "fake"
         
-        if not gemini_key and not openai_key:
+        if not gemini_key and not openai_key and not fake_llm:
             return {
                 "error": "LLM API key not configured. Set GEMINI_API_KEY or OPENAI_API_KEY environment variable.",
                 "content": "I'm sorry, but I'm not configured with an LLM API key. You can still use the Direct Search tab!",
@@ -144,11 +463,41 @@ async def chat_endpoint(request: ChatRequest):
         # Import ChatBackend handler
         from ChatBackend import handle_chat
         
-        # Call the chat handler
-        response = await handle_chat(request.messages)
+        # Call the chat handler; abandon the turn if the browser goes away
+        response = await _run_unless_disconnected(
+            http_request,
+            handle_chat(
+                request.messages,
+                use_cache=request.cache,
+                data_generation=data_generation(),
+                deadline=deadline,
+            )
+        )
         
+        CHAT_OUTCOMES["timed_out" if response.get("timed_out") else "completed"] += 1
+        server_span = Tracing.current_span()
+        if request.timings and server_span is not None:
+            # Copy: the cache may hold a reference to the response dict
+            response = {**response, "timings": Tracing.timings(server_span.trace_id, server_span)}
         return response
         
+    except ClientDisconnected:
+        CHAT_OUTCOMES["disconnected"] += 1
+        # Nobody is listening; 499 is the conventional "client closed request" code
+        return JSONResponse(status_code=499, content={"error": "Client disconnected"})
+    except AdmissionRejected as e:
+        CHAT_OUTCOMES["busy"] += 1
+        # Shed load quickly instead of queueing behind a rate-limited provider
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": e.retry_after_header},
+            content={
+                "error": f"Busy: {e}",
+                "content": "The assistant is busy right now. Please try again in a moment.",
+                "tool_called": False,
+                "retry_after": e.retry_after_header
+            }
+        )
     except ImportError as e:
         return {
             "error": f"Chat backend not available: {str(e)}",
@@ -156,6 +505,7 @@ async def chat_endpoint(request: ChatRequest):
             "tool_called": False
         }
     except Exception as e:
+        CHAT_OUTCOMES["failed"] += 1
         return {
             "error": str(e),
             "content": f"An error occurred: {str(e)}",
@@ -4,11 +4,32 @@ from typing import Optional
 from pydantic import BaseModel, Field
 import httpx
 import asyncio
+import argparse
+import base64
+import contextlib
+import functools
+import json
+import os
+import time
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from mcp.server.stdio import stdio_server
+from SearchBatcher import SearchBatcher
+import Metrics
+import Tracing
 
-DATA_API_URL = "http://localhost:8000"
+DATA_API_URL = os.environ.get("DATA_API_URL", "http://localhost:8000")
+
+# Searches arriving within this window are sent as one batch; 0 (the default) disables batching,
+# since every search then waits for the window, even when nothing else is running
+SEARCH_BATCH_WINDOW_MS = float(os.environ.get("SEARCH_BATCH_WINDOW_MS", "0"))
+SEARCH_BATCH_MAX = int(os.environ.get("SEARCH_BATCH_MAX", "64"))
+
+# Upper bound for one search round trip; callers may pass a tighter deadline
+SEARCH_TIMEOUT_SECONDS = float(os.environ.get("SEARCH_TIMEOUT_SECONDS", "10"))
+
+# search_users pages larger than this are returned as several content items of this many users
+MCP_CHUNK_SIZE = int(os.environ.get("MCP_CHUNK_SIZE", "25"))
 
 # Tool input schema
 class SearchUsersInput(BaseModel):
@@ -31,16 +52,154 @@ class SearchUsersInput(BaseModel):
     )
 
 
-async def search_users_tool(input: SearchUsersInput):
-    """Call the data API to search for users"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{DATA_API_URL}/users/search",
-            params=input.model_dump(exclude_none=True),
+class GetUsersByIdsInput(BaseModel):
+    ids: list[str] = Field(
+        ...,
+        description="User ids to fetch (max 100)",
+        min_length=1,
+        max_length=100
+    )
+
+
+class CountUsersInput(BaseModel):
+    query: Optional[str] = Field(
+        None,
+        description="Only count users whose name or email contains this text"
+    )
+    role: Optional[str] = Field(
+        None,
+        description="Only count users with this role"
+    )
+
+
+# One pooled client per event loop, shared by every tool call (and every MCP
+# client when running over HTTP) instead of a new connection per call
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop = None
+
+
+async def _inject_trace_headers(request: httpx.Request):
+    """Continue the caller's trace on the data API (traceparent header)"""
+    Tracing.inject_headers(request.headers)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive connection pool to the data API"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            base_url=DATA_API_URL,
+            timeout=SEARCH_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            event_hooks={"request": [_inject_trace_headers]},
         )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared pool (call on server shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+async def _data_api_request(method: str, path: str, **kwargs) -> httpx.Response:
+    """One request to the data API inside a client span.
+
+    The span covers connection-pool queueing and the network on top of the
+    data API's own server span; its traceparent is what the request carries.
+    """
+    with Tracing.span(f"data_api {method} {path}", kind=Tracing.KIND_CLIENT, **{"http.method": method}) as span:
+        response = await get_http_client().request(method, path, **kwargs)
+        if span is not None:
+            span.set(**{"http.status_code": response.status_code})
+        return response
+
+
+async def _fetch_search(params: dict, timeout: float = SEARCH_TIMEOUT_SECONDS) -> dict:
+    """Single search request to the data API"""
+    response = await _data_api_request(
+        "GET",
+        "/users/search",
+        params=params,
+        timeout=timeout,
+    )
 
     response.raise_for_status()
-    data = response.json()
+    return response.json()
+
+
+async def _fetch_search_batch(searches: list[dict], timeout: Optional[float] = None) -> list[dict]:
+    """Several searches in one request to the data API, within the tightest caller's `timeout`"""
+    response = await _data_api_request(
+        "POST",
+        "/users/search/batch",
+        json={"searches": searches},
+        timeout=SEARCH_TIMEOUT_SECONDS if timeout is None else min(timeout, SEARCH_TIMEOUT_SECONDS),
+    )
+
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+_search_batcher = SearchBatcher(
+    _fetch_search_batch,
+    window_ms=SEARCH_BATCH_WINDOW_MS,
+    max_batch=SEARCH_BATCH_MAX,
+)
+
+
+def search_batch_stats() -> dict:
+    """Micro-batching statistics for the status endpoint"""
+    if SEARCH_BATCH_WINDOW_MS <= 0:
+        return {"enabled": False}
+    return _search_batcher.stats()
+
+
+TOOL_CALL_SECONDS = Metrics.histogram(
+    "tool_call_duration_seconds",
+    "Tool call latency, including batching and the data API round trip",
+    ("tool", "outcome"),
+)
+
+
+def timed_tool(name: str):
+    """Record a tool's latency and outcome (ok, timeout, error) in TOOL_CALL_SECONDS, and trace it"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with Tracing.span(f"tool.{name}"):
+                    result = await fn(*args, **kwargs)
+                outcome = "ok"
+                return result
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            finally:
+                TOOL_CALL_SECONDS.observe(time.perf_counter() - started, name, outcome)
+        return wrapper
+    return decorator
+
+
+@timed_tool("search_users")
+async def search_users_tool(input: SearchUsersInput, timeout: Optional[float] = None):
+    """Call the data API to search for users.
+
+    `timeout` (seconds) caps the whole call, including time spent waiting for
+    a batch; asyncio.TimeoutError is raised when it runs out.
+    """
+    params = input.model_dump(exclude_none=True)
+    timeout = SEARCH_TIMEOUT_SECONDS if timeout is None else min(timeout, SEARCH_TIMEOUT_SECONDS)
+    if SEARCH_BATCH_WINDOW_MS > 0:
+        data = await asyncio.wait_for(_search_batcher.submit(params, timeout), timeout)
+    else:
+        data = await asyncio.wait_for(_fetch_search(params, timeout), timeout)
 
     # 🔥 IMPORTANT: Keep tool responses structured + safe
     return {
@@ -51,6 +210,56 @@ async def search_users_tool(input: SearchUsersInput):
     }
 
 
+@timed_tool("get_users_by_ids")
+async def get_users_by_ids_tool(input: GetUsersByIdsInput, timeout: Optional[float] = None):
+    """Fetch specific users by id in one request"""
+    timeout = SEARCH_TIMEOUT_SECONDS if timeout is None else min(timeout, SEARCH_TIMEOUT_SECONDS)
+    response = await _data_api_request(
+        "GET",
+        "/users/by_ids",
+        params={"ids": input.ids},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    return {
+        "summary": f"Found {len(data['items'])} of {len(input.ids)} requested users",
+        "returned": len(data["items"]),
+        "users": data["items"],
+        "missing": data["missing"],
+    }
+
+
+@timed_tool("count_users")
+async def count_users_tool(input: CountUsersInput, timeout: Optional[float] = None):
+    """Count users (total and per role) without fetching any records"""
+    timeout = SEARCH_TIMEOUT_SECONDS if timeout is None else min(timeout, SEARCH_TIMEOUT_SECONDS)
+    response = await _data_api_request(
+        "GET",
+        "/users/count",
+        params=input.model_dump(exclude_none=True),
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    breakdown = ", ".join(f"{role}: {count}" for role, count in sorted(data["by_role"].items()))
+    return {
+        "summary": f"{data['total']} users" + (f" ({breakdown})" if breakdown else ""),
+        "total": data["total"],
+        "by_role": data["by_role"],
+    }
+
+
+# Tool name -> (input model, implementation); shared with ChatBackend
+TOOLS = {
+    "search_users": (SearchUsersInput, search_users_tool),
+    "get_users_by_ids": (GetUsersByIdsInput, get_users_by_ids_tool),
+    "count_users": (CountUsersInput, count_users_tool),
+}
+
+
 # Create MCP server instance
 app = Server("user-search-mcp")
 
@@ -82,6 +291,42 @@ async def list_tools() -> list[Tool]:
                         "type": "integer",
                         "description": "Pagination offset",
                         "default": 0
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from a previous call; continues that search"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_users_by_ids",
+            description="Fetch users by id. Use this instead of search_users when the ids are already known.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "User ids to fetch (max 100)"
+                    }
+                },
+                "required": ["ids"]
+            }
+        ),
+        Tool(
+            name="count_users",
+            description="Count users, in total and per role, without returning user records.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Only count users whose name or email contains this text"
+                    },
+                    "role": {
+                        "type": "string",
+                        "description": "Only count users with this role"
                     }
                 }
             }
@@ -89,19 +334,116 @@ async def list_tools() -> list[Tool]:
     ]
 
 
+def encode_cursor(input: SearchUsersInput) -> str:
+    """Opaque cursor that resumes a search at input.offset"""
+    raw = json.dumps(input.model_dump(exclude_none=True), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+async def _report_progress(progress: int, total: int):
+    """Send an MCP progress notification if the client asked for them"""
+    ctx = app.request_context
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return
+    await ctx.session.send_progress_notification(
+        progress_token=token,
+        progress=progress,
+        total=total,
+        related_request_id=ctx.request_id,
+    )
+
+
+def _resume_from_cursor(cursor: str, arguments: dict) -> dict:
+    """Search arguments stored in `cursor`; an explicit `limit` still applies.
+
+    Explicit `query`/`role` arguments must match the cursor's: a cursor
+    continues one particular search and is not silently re-targeted.
+    """
+    resumed = decode_cursor(cursor)
+    for key in ("query", "role"):
+        if arguments.get(key) is not None and arguments[key] != resumed.get(key):
+            raise ValueError(f"cursor continues a search with {key}={resumed.get(key)!r}, not {arguments[key]!r}")
+    if arguments.get("limit") is not None:
+        resumed["limit"] = arguments["limit"]
+    return resumed
+
+
+async def call_search_users_chunked(arguments: dict) -> list[TextContent]:
+    """search_users for MCP clients: chunked content, progress and a resume cursor.
+
+    The page (at most 100 users) is fetched in one request. Larger result sets
+    are read page by page with `next_cursor`, and each call reports progress
+    through the whole result set. A page bigger than MCP_CHUNK_SIZE is
+    returned as a summary item plus one content item per chunk instead of a
+    single blob.
+    """
+    arguments = dict(arguments)
+    cursor = arguments.pop("cursor", None)
+    if cursor:
+        arguments = _resume_from_cursor(cursor, arguments)
+    input_data = SearchUsersInput(**arguments)
+
+    result = await search_users_tool(input_data)
+    total, users = result["total"], result["users"]
+    returned = len(users)
+    await _report_progress(min(total, input_data.offset + returned), total)
+
+    summary = {
+        "summary": f"Found {total} users",
+        "total": total,
+        "returned": returned,
+    }
+    if input_data.offset + returned < total and returned:
+        summary["next_cursor"] = encode_cursor(
+            input_data.model_copy(update={"offset": input_data.offset + returned})
+        )
+
+    if returned <= MCP_CHUNK_SIZE:
+        # Small result: keep the single-blob shape existing clients expect
+        return [TextContent(type="text", text=json.dumps({**summary, "users": users}, indent=2))]
+    chunks = [
+        TextContent(
+            type="text",
+            text=json.dumps({"offset": input_data.offset + start, "users": users[start:start + MCP_CHUNK_SIZE]},
+                            separators=(",", ":")),
+        )
+        for start in range(0, returned, MCP_CHUNK_SIZE)
+    ]
+    summary["chunks"] = len(chunks)
+    return [TextContent(type="text", text=json.dumps(summary, indent=2)), *chunks]
+
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls"""
     if name == "search_users":
+        try:
+            return await call_search_users_chunked(arguments)
+        except Exception as e:
+            return [
+                TextContent(
+                    type="text",
+                    text=f"Error: {str(e)}"
+                )
+            ]
+    elif name in TOOLS:
+        input_model, tool_fn = TOOLS[name]
         try:
             # Validate and parse input
-            input_data = SearchUsersInput(**arguments)
+            input_data = input_model(**arguments)
             
             # Call the tool function
-            result = await search_users_tool(input_data)
+            result = await tool_fn(input_data)
             
             # Format response for MCP
-            import json
             return [
                 TextContent(
                     type="text",
@@ -121,13 +463,106 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
 async def main():
     """Run the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        await close_http_client()
+
+
+def build_http_app(transport: str = "http"):
+    """ASGI app serving this MCP server to many clients at once.
+
+    "http" is the streamable HTTP transport (endpoint /mcp); "sse" is the older
+    HTTP+SSE transport (GET /sse, POST /messages/). Every client shares one
+    process, so the data API connection pool and search batcher are shared too.
+    Both also serve Prometheus metrics at GET /metrics, spans at GET /traces
+    and a readiness probe at GET /readyz.
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Mount, Route
+
+    async def metrics(request):
+        return Response(Metrics.render(), media_type=Metrics.CONTENT_TYPE)
+
+    async def traces(request):
+        return JSONResponse(Tracing.export_otlp(request.query_params.get("trace_id")))
+
+    async def readyz(request):
+        return JSONResponse({"ready": True})
+
+    if transport == "sse":
+        from mcp.server.sse import SseServerTransport
+
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request):
+            async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await app.run(read_stream, write_stream, app.create_initialization_options())
+            return Response()
+
+        @contextlib.asynccontextmanager
+        async def sse_lifespan(_):
+            yield
+            await close_http_client()
+
+        return Starlette(
+            routes=[
+                Route("/sse", endpoint=handle_sse, methods=["GET"]),
+                Mount("/messages/", app=sse.handle_post_message),
+                Route("/metrics", endpoint=metrics, methods=["GET"]),
+                Route("/traces", endpoint=traces, methods=["GET"]),
+                Route("/readyz", endpoint=readyz, methods=["GET"]),
+            ],
+            lifespan=sse_lifespan,
         )
 
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+    session_manager = StreamableHTTPSessionManager(app=app)
+
+    async def handle_streamable_http(scope, receive, send):
+        await session_manager.handle_request(scope, receive, send)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_):
+        async with session_manager.run():
+            yield
+        await close_http_client()
+
+    return Starlette(
+        routes=[
+            Mount("/mcp", app=handle_streamable_http),
+            Route("/metrics", endpoint=metrics, methods=["GET"]),
+            Route("/traces", endpoint=traces, methods=["GET"]),
+            Route("/readyz", endpoint=readyz, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="User search MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "http", "sse"],
+        default=os.environ.get("MCP_TRANSPORT", "stdio"),
+        help="stdio (one client per process), http (streamable HTTP) or sse",
+    )
+    parser.add_argument("--host", default=os.environ.get("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MCP_PORT", "8001")))
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.transport == "stdio":
+        asyncio.run(main())
+    else:
+        import uvicorn
+        uvicorn.run(build_http_app(args.transport), host=args.host, port=args.port)
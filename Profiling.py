@@ -0,0 +1,303 @@
+# observability/profiling.py
+
+"""
+Opt-in profiling for slow requests that cannot be reproduced locally.
+
+Two modes, both off unless PROFILE_TOKEN is set:
+
+- Per request: send `X-Profile-Token: <token>` to a profiled path and that
+  request runs under cProfile. The .prof file is written to PROFILE_DIR and
+  named in the `X-Profile-File` response header; only the newest
+  PROFILE_MAX_FILES are kept. The token is never read from the query string,
+  where access logs would record it.
+- Slowest N: with PROFILE_SLOWEST_N > 0, a background thread samples the event
+  loop thread's stack every PROFILE_SAMPLE_INTERVAL_MS while requests are in
+  flight, and the N slowest requests are kept with their most common stacks.
+
+Both are read back through token-protected endpoints on the data API.
+cProfile and the sampler only see the event loop thread; time spent in worker
+threads (the blocking LLM SDK calls) shows up as the loop awaiting.
+"""
+
+import cProfile
+import heapq
+import hmac
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_SLOWEST_N = int(os.environ.get("PROFILE_SLOWEST_N", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "100"))
+
+TOKEN_HEADER = b"x-profile-token"
+STACKS_PER_REQUEST = 5
+STACK_DEPTH = 8
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IDLE = "<event loop idle: awaiting I/O or worker threads>"
+# (package dir, file, function) of the frame the loop thread sits in while it waits for events.
+# With the default loop that is the selector; uvloop waits in C, so the innermost
+# Python frame is whatever started the loop (uvicorn runs it through asyncio.Runner).
+LOOP_WAIT_FRAMES = {
+    ("asyncio", "runners.py", "run"),
+    ("asyncio", "base_events.py", "run_forever"),
+    ("asyncio", "base_events.py", "run_until_complete"),
+    ("asyncio", "base_events.py", "_run_once"),
+    ("uvloop", "__init__.py", "run"),
+}
+
+
+def check_token(token: Optional[str]) -> bool:
+    """True if profiling is enabled and `token` matches PROFILE_TOKEN"""
+    if not PROFILE_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+
+def _request_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == TOKEN_HEADER:
+            return value.decode("latin-1")
+    return None
+
+
+def _redacted_query(scope) -> str:
+    # Older clients sent the token as ?profile=; keep it out of the recorded query
+    query = scope.get("query_string", b"").decode("latin-1")
+    return urlencode([(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k != "profile"])
+
+
+def _is_loop_waiting(code) -> bool:
+    directory, filename = os.path.split(code.co_filename)
+    if filename == "selectors.py":
+        return True
+    return (os.path.basename(directory), filename, code.co_name) in LOOP_WAIT_FRAMES
+
+
+def _summarize_stack(frame) -> str:
+    """'innermost < caller < ...' using only this repo's frames, so stacks stay readable"""
+    parts = []
+    innermost = None
+    while frame is not None and len(parts) < STACK_DEPTH:
+        code = frame.f_code
+        if innermost is None:
+            if _is_loop_waiting(code):
+                return IDLE
+            innermost = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        if code.co_filename.startswith(ROOT) and code.co_filename != __file__:
+            parts.append(f"{os.path.basename(code.co_filename)[:-3]}.{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    if not parts:
+        # Nothing of ours on the stack: the loop is in library code (framework, httpx, ...)
+        return f"<{innermost}>"
+    return " < ".join(parts)
+
+
+class SlowRequestSampler:
+    """Keeps the N slowest requests with stack samples taken while they were in flight"""
+
+    def __init__(self, keep: int, interval_ms: float):
+        self.keep = keep
+        self.interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        # request id -> (loop thread id, stack summary counts)
+        self._active: Dict[int, tuple] = {}
+        self._slowest: List[tuple] = []  # min-heap of (duration, id, record)
+        self._ids = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.samples = 0
+
+    def begin(self) -> int:
+        request_id = next(self._ids)
+        with self._lock:
+            self._active[request_id] = (threading.get_ident(), Counter())
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+            self._thread.start()
+        return request_id
+
+    def end(self, request_id: int, duration: float, scope, status: int):
+        with self._lock:
+            _, stacks = self._active.pop(request_id)
+            self.requests += 1
+            if len(self._slowest) >= self.keep and duration <= self._slowest[0][0]:
+                return
+            total = sum(stacks.values())
+            record = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": _redacted_query(scope),
+                "status": status,
+                "duration_ms": round(1000 * duration, 2),
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "samples": total,
+                "stacks": [
+                    {"stack": stack, "samples": count, "pct": round(100 * count / total, 1)}
+                    for stack, count in stacks.most_common(STACKS_PER_REQUEST)
+                ],
+            }
+            entry = (duration, request_id, record)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                by_thread: Dict[int, str] = {}
+                for thread_id, stacks in self._active.values():
+                    if thread_id not in by_thread:
+                        frame = frames.get(thread_id)
+                        by_thread[thread_id] = _summarize_stack(frame) if frame else "<no frame>"
+                    # Every request in flight on that loop is charged with the sample
+                    stacks[by_thread[thread_id]] += 1
+                self.samples += 1
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keep": self.keep,
+                "interval_ms": self.interval * 1000,
+                "requests": self.requests,
+                "samples": self.samples,
+                "in_flight": len(self._active),
+            }
+
+
+_sampler: Optional[SlowRequestSampler] = None
+
+
+def get_sampler() -> Optional[SlowRequestSampler]:
+    """The slowest-N sampler, or None when that mode is off"""
+    global _sampler
+    if _sampler is None and PROFILE_TOKEN and PROFILE_SLOWEST_N > 0:
+        _sampler = SlowRequestSampler(PROFILE_SLOWEST_N, PROFILE_SAMPLE_INTERVAL_MS)
+    return _sampler
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Absolute path of a profile written by this process (None for anything else)"""
+    path = os.path.abspath(os.path.join(PROFILE_DIR, os.path.basename(name)))
+    if not name.endswith(".prof") or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _prune_profiles(keep: int):
+    """Delete all but the newest `keep` .prof files in PROFILE_DIR (0 keeps everything)"""
+    if keep <= 0:
+        return
+    paths = [os.path.join(PROFILE_DIR, n) for n in os.listdir(PROFILE_DIR) if n.endswith(".prof")]
+    if len(paths) <= keep:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - keep]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # another worker pruned it first
+
+
+def profile_summary(path: str, sort: str = "cumulative", limit: int = 40) -> str:
+    """pstats text report for a saved profile"""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware implementing both profiling modes"""
+
+    def __init__(self, app, paths=()):
+        self.app = app
+        self.paths = tuple(paths)
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_TOKEN:
+            return await self.app(scope, receive, send)
+
+        sampler = get_sampler()
+        profiler = None
+        # cProfile is per thread and every request shares the loop thread, so one at a time
+        if scope["path"] in self.paths and not self._profiling and check_token(_request_token(scope)):
+            profiler = cProfile.Profile()
+        if sampler is None and profiler is None:
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        request_id = sampler.begin() if sampler is not None else None
+        status = [500]
+        held = []
+        name = self._profile_name(scope) if profiler is not None else None
+        profile_written = [False]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if profiler is not None:
+                    # Hold the headers until the body starts so the profile headers can be added
+                    held.append(message)
+                    return
+            elif held:
+                start = held.pop()
+                headers = [(b"x-profile-file", name.encode("latin-1"))]
+                if not message.get("more_body", False):
+                    # Whole body in one message: the profile is complete, so its time is known
+                    elapsed_ms = self._finish_profile(profiler, name, started)
+                    profile_written[0] = True
+                    headers.append((b"x-profile-time-ms", b"%.2f" % elapsed_ms))
+                # Streaming: the start must go out before the first chunk; the file is written at the end
+                start["headers"] = list(start.get("headers", [])) + headers
+                await send(start)
+            await send(message)
+
+        if profiler is not None:
+            self._profiling = True
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None and not profile_written[0]:
+                self._finish_profile(profiler, name, started)
+            if sampler is not None:
+                sampler.end(request_id, time.perf_counter() - started, scope, status[0])
+
+    @staticmethod
+    def _profile_name(scope) -> str:
+        return "%s-%s-%d.prof" % (
+            time.strftime("%Y%m%d-%H%M%S"),
+            scope["path"].strip("/").replace("/", "_") or "root",
+            int(time.time_ns() % 1_000_000),
+        )
+
+    def _finish_profile(self, profiler: cProfile.Profile, name: str, started: float) -> float:
+        """Stop profiling, write PROFILE_DIR/name; returns the profiled time in ms"""
+        profiler.disable()
+        self._profiling = False
+        elapsed_ms = 1000 * (time.perf_counter() - started)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+        _prune_profiles(PROFILE_MAX_FILES)
+        return elapsed_ms
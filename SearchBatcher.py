@@ -0,0 +1,145 @@
+# mcp_adapter/batcher.py
+
+"""
+Micro-batching for search_users tool calls.
+
+Searches submitted within a short window are coalesced into one request to
+`POST /users/search/batch` and the results are fanned back out to the waiting
+callers. Identical searches in the same window share one slot in the batch.
+The batch request is given the tightest deadline among its callers.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _retrieve_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+
+class SearchBatcher:
+    """Collect searches for `window_ms` (or until `max_batch`) and send them together"""
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]], Optional[float]], Awaitable[List[Dict[str, Any]]]],
+        window_ms: float = 2.0,
+        max_batch: int = 64,
+    ):
+        self.send_batch = send_batch
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+
+        self._loop = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_handle = None
+        # Strong references to the send tasks: the loop only keeps weak ones
+        self._tasks = set()
+
+        self.calls = 0
+        self.batches = 0
+        self.searches_sent = 0
+        self.deduplicated = 0
+        self.size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._added_latency: deque = deque(maxlen=1000)
+
+    def _bind_loop(self):
+        """Pending state belongs to one event loop; start fresh if the loop changed"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+            self._flush_handle = None
+            self._tasks = set()
+        return loop
+
+    async def submit(self, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Queue one search and wait for its result.
+
+        `timeout` (seconds) is this caller's remaining budget; the batch
+        request is sent with the smallest one left among its callers.
+        """
+        loop = self._bind_loop()
+        self.calls += 1
+        key = json.dumps(params, sort_keys=True)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        slot = self._pending.get(key)
+        if slot is None:
+            future = loop.create_future()
+            # Every waiter may have given up (shield), so nobody else is guaranteed to read the error
+            future.add_done_callback(_retrieve_exception)
+            slot = {"params": params, "future": future, "queued_at": time.perf_counter(), "deadline": deadline}
+            self._pending[key] = slot
+        else:
+            self.deduplicated += 1
+            if deadline is not None and (slot["deadline"] is None or deadline < slot["deadline"]):
+                slot["deadline"] = deadline
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_ms / 1000, self._flush)
+
+        # shield: one caller giving up must not cancel the result for the others
+        return await asyncio.shield(slot["future"])
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        slots = list(self._pending.values())
+        self._pending = {}
+        task = self._loop.create_task(self._send(slots))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, slots: List[Dict[str, Any]]):
+        sent_at = time.perf_counter()
+        for slot in slots:
+            self._added_latency.append(sent_at - slot["queued_at"])
+        self.batches += 1
+        self.searches_sent += len(slots)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if len(slots) <= bucket:
+                self.size_histogram[bucket] += 1
+                break
+
+        deadlines = [slot["deadline"] for slot in slots if slot["deadline"] is not None]
+        timeout = max(0.001, min(deadlines) - time.monotonic()) if deadlines else None
+        try:
+            results = await self.send_batch([slot["params"] for slot in slots], timeout)
+            if len(results) != len(slots):
+                raise RuntimeError(f"batch search returned {len(results)} results for {len(slots)} searches")
+        except Exception as e:
+            for slot in slots:
+                if not slot["future"].done():
+                    slot["future"].set_exception(e)
+            return
+        for slot, result in zip(slots, results):
+            if not slot["future"].done():
+                slot["future"].set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch-size histogram and the queueing latency added by batching"""
+        added = sorted(self._added_latency)
+        return {
+            "enabled": True,
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "calls": self.calls,
+            "batches": self.batches,
+            "deduplicated": self.deduplicated,
+            "avg_batch_size": round(self.searches_sent / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": {f"le_{bucket}": count for bucket, count in self.size_histogram.items()},
+            "added_latency_avg_ms": round(1000 * sum(added) / len(added), 3) if added else 0.0,
+            "added_latency_p95_ms": round(1000 * added[int(0.95 * (len(added) - 1))], 3) if added else 0.0,
+        }
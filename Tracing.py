@@ -0,0 +1,242 @@
+# observability/tracing.py
+
+"""
+Lightweight distributed tracing for one chat turn across its hops:
+chat endpoint -> LLM calls -> tool -> loopback HTTP search.
+
+Trace context travels in the W3C `traceparent` header; inside a process the
+current span lives in a contextvar, so it follows asyncio tasks. Finished
+spans go into a bounded in-process ring buffer that can be exported as
+OTLP/JSON (the body of an OTLP/HTTP traces export request), e.g. to feed an
+OpenTelemetry collector or to look at in a trace viewer.
+
+TRACING_ENABLED=false turns span recording off; TRACE_BUFFER_SIZE sets how
+many finished spans are kept.
+"""
+
+import contextlib
+import contextvars
+import os
+import re
+import secrets
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() not in ("0", "false", "no")
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", "4096"))
+SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "user-search")
+
+# OTLP SpanKind values
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_finished: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """(trace_id, parent span id) from a traceparent header, or None if absent/invalid"""
+    match = TRACEPARENT_RE.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(
+    name: str,
+    kind: int = KIND_INTERNAL,
+    traceparent: Optional[str] = None,
+    **attributes,
+) -> Iterator[Optional[Span]]:
+    """Record a span around a block; a child of the current span unless `traceparent` is given.
+
+    Yields None when tracing is disabled, so callers must not rely on the span.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    remote = parse_traceparent(traceparent) if traceparent else None
+    parent = _current.get()
+    if remote is not None:
+        trace_id, parent_id = remote
+    elif parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    current = Span(name, trace_id, parent_id, kind, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        _finished.append(current)
+
+
+def inject_headers(headers) -> None:
+    """Add the current span's traceparent to outgoing request headers"""
+    current = _current.get()
+    if current is not None:
+        headers["traceparent"] = current.traceparent
+
+
+def spans(trace_id: Optional[str] = None, limit: Optional[int] = None) -> List[Span]:
+    """Finished spans, oldest first (optionally one trace, optionally only the newest `limit`)"""
+    found = [s for s in list(_finished) if trace_id is None or s.trace_id == trace_id]
+    return found[-limit:] if limit else found
+
+
+def timings(trace_id: str, root: Optional[Span] = None) -> Dict[str, Any]:
+    """Per-hop latency breakdown of one trace, for the /api/chat `timings` field.
+
+    `root` is the still-open request span; offsets are relative to its start.
+    """
+    found = spans(trace_id)
+    names = {s.span_id: s.name for s in found}
+    if root is not None:
+        names[root.span_id] = root.name
+    start_ns = root.start_ns if root is not None else min((s.start_ns for s in found), default=0)
+    by_name: Dict[str, float] = {}
+    for s in found:
+        by_name[s.name] = by_name.get(s.name, 0.0) + s.duration_ms
+    result = {
+        "trace_id": trace_id,
+        "spans": [
+            {
+                "name": s.name,
+                "parent": names.get(s.parent_id),
+                "start_ms": round((s.start_ns - start_ns) / 1e6, 3),
+                "duration_ms": round(s.duration_ms, 3),
+                **({"error": s.error} if s.error else {}),
+            }
+            for s in sorted(found, key=lambda s: s.start_ns)
+        ],
+        "total_by_name_ms": {name: round(ms, 3) for name, ms in by_name.items()},
+    }
+    if root is not None:
+        result["total_ms"] = round((time.time_ns() - root.start_ns) / 1e6, 3)
+    return result
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # int64 is a string in OTLP/JSON
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    result = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items() if v is not None],
+        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+    }
+    if s.parent_id:
+        result["parentSpanId"] = s.parent_id
+    return result
+
+
+def export_otlp(trace_id: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Buffered spans as an OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                ],
+            },
+            "scopeSpans": [{
+                "scope": {"name": "Tracing"},
+                "spans": [_otlp_span(s) for s in spans(trace_id, limit)],
+            }],
+        }],
+    }
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span per HTTP request.
+
+    Continues the caller's trace when a `traceparent` header is present and
+    returns the trace id in `X-Trace-Id`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with span(f"{scope['method']} {scope['path']}", kind=KIND_SERVER, traceparent=traceparent) as server:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    server.set(**{"http.status_code": message["status"]})
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", server.trace_id.encode("ascii"))
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                # Name the span after the route template once routing has happened
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    server.name = f"{scope['method']} {route}"
+                server.set(**{"http.method": scope["method"], "http.target": scope["path"]})
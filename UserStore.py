@@ -0,0 +1,491 @@
+# data_api/user_store.py
+
+"""
+Storage backends for the user data API.
+
+InMemoryUserStore keeps users in a Python list (the original behaviour);
+SQLiteUserStore keeps them in a SQLite file, so the dataset can exceed RAM
+and survives restarts. Both return results in insertion order, so paging
+through either gives the same pages.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (query, role, limit, offset)
+SearchParams = Tuple[Optional[str], Optional[str], int, int]
+
+# Trigrams need at least three characters; shorter queries fall back to LIKE over name_lc/email_lc
+FTS_MIN_QUERY = 3
+
+
+def _add_stage(stages: Optional[Dict[str, float]], stage: str, seconds: float):
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def _fingerprinted(users: Iterable[Dict[str, str]], digest) -> Iterable[Dict[str, str]]:
+    """Yield `users` unchanged while feeding each one into `digest`"""
+    for u in users:
+        digest.update(json.dumps([u["id"], u["name"], u["email"], u["role"], u["created_at"]]).encode("utf-8"))
+        digest.update(b"\n")
+        yield u
+
+
+def dataset_fingerprint(users: Iterable[Dict[str, str]]) -> str:
+    """Content hash of a dataset, used as its `source` when the caller has none"""
+    digest = hashlib.sha256()
+    for _ in _fingerprinted(users, digest):
+        pass
+    return "sha256:" + digest.hexdigest()
+
+
+class UserStore:
+    """Interface shared by the storage backends.
+
+    Reads are async so a backend can do blocking I/O off the event loop;
+    `load` and `warm_up` are synchronous and only called during startup.
+    """
+
+    name = "base"
+    # Identifies the dataset currently held (see `load`); part of the chat cache key
+    source: Optional[str] = None
+
+    def load(self, users: Iterable[Dict[str, str]], source: Optional[str] = None) -> int:
+        """Replace every user; returns the new size.
+
+        `source` identifies the dataset (e.g. "synthetic:100000:42"); a
+        persistent store that already holds that dataset may skip the reload.
+        Without one, the content hash of `users` is used instead.
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Build indexes / open connections ahead of the first request"""
+
+    async def search(
+        self,
+        query: Optional[str],
+        role: Optional[str],
+        limit: int,
+        offset: int,
+        stages: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        """{"total": matches, "items": one page of users}.
+
+        If `stages` is given, seconds spent in each backend-specific stage are
+        added to it (for the search_stage_duration_seconds histogram).
+        """
+        raise NotImplementedError
+
+    async def search_many(
+        self, searches: Sequence[SearchParams], stages: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Several searches at once (the batch endpoint); `stages` sums over all of them"""
+        return [await self.search(*params, stages=stages) for params in searches]
+
+    async def get_by_ids(self, ids: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        """id -> user for the ids that exist"""
+        raise NotImplementedError
+
+    async def count(self, query: Optional[str], role: Optional[str]) -> Dict[str, int]:
+        """Matching users per role; with a `role` filter, always {role: n}, even when n is 0"""
+        raise NotImplementedError
+
+    async def size(self) -> int:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class InMemoryUserStore(UserStore):
+    """Users in a list with a primary-key index and precomputed role counts.
+
+    Searches scan the list on the event loop, which is fine for small
+    datasets and the fastest option while everything fits in memory.
+    """
+
+    name = "memory"
+
+    def __init__(self, users: List[Dict[str, str]]):
+        # A copy: the id index, role counts and `source` describe this list, so
+        # changes must go through `load`, not through edits to the caller's list
+        self.users = list(users)
+        self.source = dataset_fingerprint(users)
+        self._indexes = None
+
+    def load(self, users: Iterable[Dict[str, str]], source: Optional[str] = None) -> int:
+        self.users = list(users)
+        self.source = source or dataset_fingerprint(self.users)
+        self._indexes = None
+        return len(self.users)
+
+    def warm_up(self):
+        self._get_indexes()
+
+    def _get_indexes(self):
+        """(users_by_id, role_counts), built on first use or during warm-up"""
+        if self._indexes is None:
+            users_by_id = {u["id"]: u for u in self.users}
+            role_counts: Dict[str, int] = {}
+            for u in self.users:
+                role_counts[u["role"]] = role_counts.get(u["role"], 0) + 1
+            self._indexes = (users_by_id, role_counts)
+        return self._indexes
+
+    def _filter(self, query: Optional[str], role: Optional[str]) -> List[Dict[str, str]]:
+        """Users matching the free-text query (name/email) and role"""
+        filtered_users = self.users[:]
+
+        # Filter by query (search in name and email)
+        if query:
+            query_lower = query.lower()
+            filtered_users = [
+                u for u in filtered_users
+                if query_lower in u["name"].lower() or query_lower in u["email"].lower()
+            ]
+
+        # Filter by role
+        if role:
+            filtered_users = [u for u in filtered_users if u["role"] == role]
+
+        return filtered_users
+
+    async def search(self, query, role, limit, offset, stages=None):
+        started = time.perf_counter()
+        filtered_users = self._filter(query, role)
+        filtered = time.perf_counter()
+        items = filtered_users[offset:offset + limit]
+        _add_stage(stages, "filter", filtered - started)
+        _add_stage(stages, "paginate", time.perf_counter() - filtered)
+        return {"total": len(filtered_users), "items": items}
+
+    async def get_by_ids(self, ids):
+        users_by_id, _ = self._get_indexes()
+        return {i: users_by_id[i] for i in ids if i in users_by_id}
+
+    async def count(self, query, role):
+        if not query:
+            # Served straight from the precomputed role counts
+            _, role_counts = self._get_indexes()
+            return dict(role_counts) if not role else {role: role_counts.get(role, 0)}
+        by_role: Dict[str, int] = {role: 0} if role else {}
+        for u in self._filter(query, role):
+            by_role[u["role"]] = by_role.get(u["role"], 0) + 1
+        return by_role
+
+    async def size(self):
+        return len(self.users)
+
+    def stats(self):
+        return {"backend": self.name, "users": len(self.users)}
+
+
+# Bumped whenever SCHEMA changes; a database with another version is rebuilt
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    -- Explicit rowid: VACUUM may renumber implicit rowids, which the FTS index refers to
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    role TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    -- str.lower() copies for the LIKE fallback: SQLite's LIKE only folds ASCII case
+    name_lc TEXT NOT NULL,
+    email_lc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_role ON users(role);
+CREATE INDEX IF NOT EXISTS users_created_at ON users(created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    name, email, content='users', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_phrase(query: str) -> str:
+    return '"' + query.replace('"', '""') + '"'
+
+
+class SQLiteUserStore(UserStore):
+    """Users in a SQLite database (WAL mode).
+
+    Name/email search uses an FTS5 trigram index, which matches substrings
+    case-insensitively like the in-memory store does. Queries shorter than
+    three characters fall back to a LIKE scan over lowercased copies of name
+    and email, made with str.lower() so non-ASCII letters fold the same way
+    as in memory. Reads run in a thread pool, each on a connection from a
+    fixed pool, so queries never block the event loop and run in parallel
+    (sqlite3 releases the GIL while it works).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, read_connections: int = 4, seed: Optional[List[Dict[str, str]]] = None):
+        self.path = path
+        self.read_connections = read_connections
+        self._writer = self._connect()
+        self._create_schema()
+        self._readers: Optional[queue.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._role_counts: Optional[Dict[str, int]] = None
+        if seed is not None and self._writer.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+            self.load(seed, source=dataset_fingerprint(seed))
+        row = self._writer.execute("SELECT value FROM store_meta WHERE key = 'source'").fetchone()
+        self.source = row["value"] if row is not None else None
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        # Autocommit: transactions are explicit, and readers see new data on every query
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if readonly:
+            conn.execute("PRAGMA query_only=1")
+            conn.execute("PRAGMA cache_size=-32000")  # 32 MB page cache per reader
+            conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    def _create_schema(self):
+        db = self._writer
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # A file from an older layout is rebuilt; dropping store_meta makes the
+                # next load (or the seed) fill it again instead of skipping
+                for table in ("users_fts", "users", "store_meta"):
+                    db.execute(f"DROP TABLE IF EXISTS {table}")
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        db.execute(statement)
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def load(self, users: Iterable[Dict[str, str]], source: Optional[str] = None) -> int:
+        db = self._writer
+        # IMMEDIATE takes the write lock up front, so several API workers starting
+        # together load the dataset once and the others see `source` already set
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT value FROM store_meta WHERE key = 'source'").fetchone()
+            if source is not None and row is not None and row["value"] == source:
+                db.execute("ROLLBACK")
+                self.source = source
+                return self._size()
+            db.execute("DELETE FROM users")
+            digest = hashlib.sha256()
+            db.executemany(
+                "INSERT INTO users (id, name, email, role, created_at, name_lc, email_lc) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (u["id"], u["name"], u["email"], u["role"], u["created_at"], u["name"].lower(), u["email"].lower())
+                    for u in _fingerprinted(users, digest)
+                ),
+            )
+            db.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+            source = source or "sha256:" + digest.hexdigest()
+            db.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('source', ?)",
+                (source,),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("PRAGMA optimize")
+        self.source = source
+        self._role_counts = None
+        return self._size()
+
+    def _size(self) -> int:
+        return self._writer.execute("SELECT count(*) FROM users").fetchone()[0]
+
+    def warm_up(self):
+        self._pool()
+        self._with_reader(self._cached_role_counts)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._readers = queue.Queue()
+            for _ in range(self.read_connections):
+                self._readers.put(self._connect(readonly=True))
+            self._executor = ThreadPoolExecutor(self.read_connections, thread_name_prefix="sqlite-read")
+        return self._executor
+
+    def _with_reader(self, fn, *args):
+        conn = self._readers.get()
+        try:
+            return fn(conn, *args)
+        finally:
+            self._readers.put(conn)
+
+    async def _read(self, fn, *args):
+        """Run fn(connection, *args) on a pooled read connection in the thread pool"""
+        executor = self._pool()
+        return await asyncio.get_running_loop().run_in_executor(executor, self._with_reader, fn, *args)
+
+    def _cached_role_counts(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Per-role totals, cached until the next load (computed during warm-up)"""
+        if self._role_counts is None:
+            rows = conn.execute("SELECT role, count(*) FROM users GROUP BY role").fetchall()
+            self._role_counts = {role: n for role, n in rows}
+        return self._role_counts
+
+    async def _get_role_counts(self) -> Dict[str, int]:
+        if self._role_counts is None:
+            return await self._read(self._cached_role_counts)
+        return self._role_counts
+
+    @staticmethod
+    def _where(query: Optional[str], role: Optional[str]) -> Tuple[str, list]:
+        clauses, params = [], []
+        if query:
+            if len(query) >= FTS_MIN_QUERY:
+                clauses.append("rowid IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)")
+                params.append(_fts_phrase(query))
+            else:
+                clauses.append("(name_lc LIKE ? ESCAPE '\\' OR email_lc LIKE ? ESCAPE '\\')")
+                params.extend([_like_pattern(query.lower())] * 2)
+        if role:
+            clauses.append("role = ?")
+            params.append(role)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _search_sync(self, conn: sqlite3.Connection, query, role, limit, offset, stages=None) -> Dict[str, Any]:
+        if query and len(query) >= FTS_MIN_QUERY and not role:
+            return self._text_search_sync(conn, query, limit, offset, stages)
+        started = time.perf_counter()
+        where, params = self._where(query, role)
+        if query:
+            total = conn.execute(f"SELECT count(*) FROM users{where}", params).fetchone()[0]
+        else:
+            # No text filter: the cached role counts already hold the total
+            counts = self._cached_role_counts(conn)
+            total = counts.get(role, 0) if role else sum(counts.values())
+        counted = time.perf_counter()
+        rows = conn.execute(
+            f"SELECT id, name, email, role, created_at FROM users{where} ORDER BY rowid LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        items = [dict(row) for row in rows]
+        _add_stage(stages, "count", counted - started)
+        _add_stage(stages, "page", time.perf_counter() - counted)
+        return {"total": total, "items": items}
+
+    @staticmethod
+    def _text_search_sync(conn: sqlite3.Connection, query, limit, offset, stages=None) -> Dict[str, Any]:
+        """Text-only search answered from the FTS index alone: no join for the count,
+        and the page is cut inside the FTS scan (which yields rowids in order)"""
+        started = time.perf_counter()
+        phrase = _fts_phrase(query)
+        total = conn.execute("SELECT count(*) FROM users_fts WHERE users_fts MATCH ?", (phrase,)).fetchone()[0]
+        counted = time.perf_counter()
+        rows = conn.execute(
+            "SELECT id, name, email, role, created_at FROM users WHERE rowid IN ("
+            "SELECT rowid FROM users_fts WHERE users_fts MATCH ? ORDER BY rowid LIMIT ? OFFSET ?"
+            ") ORDER BY rowid",
+            (phrase, limit, offset),
+        ).fetchall()
+        items = [dict(row) for row in rows]
+        _add_stage(stages, "count", counted - started)
+        _add_stage(stages, "page", time.perf_counter() - counted)
+        return {"total": total, "items": items}
+
+    def _search_many_sync(self, conn, searches, stages=None):
+        return [self._search_sync(conn, *params, stages) for params in searches]
+
+    async def search(self, query, role, limit, offset, stages=None):
+        return await self._read(self._search_sync, query, role, limit, offset, stages)
+
+    async def search_many(self, searches, stages=None):
+        # One thread hop and one connection for the whole batch
+        return await self._read(self._search_many_sync, list(searches), stages)
+
+    @staticmethod
+    def _get_by_ids_sync(conn, ids):
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT id, name, email, role, created_at FROM users WHERE id IN ({placeholders})", list(ids)
+        ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    async def get_by_ids(self, ids):
+        return await self._read(self._get_by_ids_sync, list(ids))
+
+    def _count_sync(self, conn, query, role):
+        where, params = self._where(query, role)
+        rows = conn.execute(f"SELECT role, count(*) FROM users{where} GROUP BY role", params).fetchall()
+        by_role = {role: 0} if role else {}
+        by_role.update((r, n) for r, n in rows)
+        return by_role
+
+    async def count(self, query, role):
+        if not query:
+            counts = await self._get_role_counts()
+            return dict(counts) if not role else {role: counts.get(role, 0)}
+        return await self._read(self._count_sync, query, role)
+
+    async def size(self):
+        return sum((await self._get_role_counts()).values())
+
+    async def close(self):
+        if self._executor is not None:
+            # Waits for queries in flight without blocking the event loop
+            await asyncio.to_thread(self._executor.shutdown, True)
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
+            self._executor = None
+            self._readers = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def stats(self):
+        # Only the cached counts: stats() runs on the event loop and must not query
+        counts = self._role_counts
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "users": sum(counts.values()) if counts is not None else None,
+            "read_connections": self.read_connections,
+        }
+
+
+def store_from_env(seed: List[Dict[str, str]]) -> UserStore:
+    """Build the store from USER_STORE / USER_STORE_PATH / USER_STORE_READ_CONNECTIONS.
+
+    `seed` is served by the in-memory store, and fills a new, empty SQLite database.
+    """
+    backend = os.environ.get("USER_STORE", "memory").lower()
+    if backend == "memory":
+        return InMemoryUserStore(seed)
+    if backend == "sqlite":
+        return SQLiteUserStore(
+            os.environ.get("USER_STORE_PATH", "users.db"),
+            read_connections=int(os.environ.get("USER_STORE_READ_CONNECTIONS", "4")),
+            seed=seed,
+        )
+    raise ValueError(f"Unknown USER_STORE {backend!r} (expected 'memory' or 'sqlite')")
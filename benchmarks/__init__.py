@@ -0,0 +1 @@
+"""Load tests and benchmarks. Run modules from the repo root, e.g. `python -m benchmarks.mcp_load`."""
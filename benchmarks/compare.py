@@ -0,0 +1,93 @@
+"""
+Compare two load-test reports from `benchmarks.loadgen` and flag regressions.
+
+A workload regresses when its p50/p95/p99 latency grows, or its RPS drops, by
+more than --threshold percent, when it has errors the baseline did not, or
+when it is missing from the candidate (it was skipped or crashed).
+Exits with status 1 if anything regressed, so it can gate CI.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def change_pct(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return 100.0 * (new - old) / old
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """Return one row per (workload, metric) with the change and whether it regressed"""
+    rows = []
+    for name in baseline["workloads"]:
+        if name not in candidate["workloads"]:
+            rows.append({
+                "workload": name,
+                "metric": "missing",
+                "baseline": "ran",
+                "candidate": "missing",
+                "change_pct": None,
+                "regressed": True,
+            })
+    for name, new in candidate["workloads"].items():
+        old = baseline["workloads"].get(name)
+        if old is None:
+            continue
+        for key in LATENCY_KEYS + ("rps",):
+            delta = change_pct(old[key], new[key])
+            worse = -delta if key == "rps" else delta
+            rows.append({
+                "workload": name,
+                "metric": key,
+                "baseline": old[key],
+                "candidate": new[key],
+                "change_pct": round(delta, 1),
+                "regressed": worse > threshold,
+            })
+        if new["errors"] > old["errors"]:
+            rows.append({
+                "workload": name,
+                "metric": "errors",
+                "baseline": old["errors"],
+                "candidate": new["errors"],
+                "change_pct": None,
+                "regressed": True,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{'workload':<10} {'metric':<8} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for row in rows:
+        change = "" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(f"{row['workload']:<10} {row['metric']:<8} {row['baseline']:>10} {row['candidate']:>10} {change:>8}{flag}")
+
+    regressions = [r for r in rows if r["regressed"]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:g}%")
+        sys.exit(1)
+    print(f"\n✅ No regressions above {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Seeded synthetic user generator.
+
+Produces users with the same shape as MOCK_USERS, with skewed (Zipf-like)
+first/last name popularity, a realistic mix of email domains, a role mix
+dominated by members, and sign-up dates that grow over time. The same seed
+always yields the same users, so benchmark runs are comparable.
+
+Usage:
+    python -m benchmarks.dataset --users 100000 --seed 42 --output users.jsonl
+
+Load into the API with USERS_FILE=users.jsonl, or generate at startup with
+SYNTHETIC_USERS=100000 (and optionally SYNTHETIC_SEED). 10M users are fine
+to write to JSONL (the generator streams), but holding them in the in-memory
+store needs several GB of RAM; use USER_STORE=sqlite for datasets that large.
+"""
+
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Christopher", "Lisa", "Daniel", "Nancy", "Matthew", "Betty", "Anthony", "Sandra", "Mark", "Margaret",
+    "Wei", "Priya", "Mohammed", "Sofia", "Hiroshi", "Olga", "Carlos", "Aisha", "Liam", "Chloe",
+    "Alice", "Bob", "Charlie", "Diana", "Mateo", "Yuki", "Fatima", "Noah", "Emma", "Arjun",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Wang", "Patel", "Kim", "Nguyen", "Singh", "Chen", "Ivanova", "Tanaka", "Silva", "Prince",
+]
+EMAIL_DOMAINS = [("example.com", 40), ("gmail.com", 30), ("outlook.com", 12), ("yahoo.com", 8), ("company.io", 10)]
+ROLES = [("member", 80), ("viewer", 12), ("admin", 7), ("owner", 1)]
+
+START_DATE = date(2019, 1, 1)
+END_DATE = date(2025, 12, 31)
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def generate_users(count: int, seed: int = 42) -> Iterator[Dict[str, str]]:
+    """Yield `count` users (ids u1..uN, created_at ascending), deterministically for a seed"""
+    rng = random.Random(seed)
+    first_weights = _zipf_weights(len(FIRST_NAMES))
+    last_weights = _zipf_weights(len(LAST_NAMES))
+    domains, domain_weights = zip(*EMAIL_DOMAINS)
+    roles, role_weights = zip(*ROLES)
+    span_days = (END_DATE - START_DATE).days
+
+    batch = 10_000
+    for start in range(0, count, batch):
+        size = min(batch, count - start)
+        firsts = rng.choices(FIRST_NAMES, first_weights, k=size)
+        lasts = rng.choices(LAST_NAMES, last_weights, k=size)
+        picked_domains = rng.choices(domains, domain_weights, k=size)
+        picked_roles = rng.choices(roles, role_weights, k=size)
+        for offset in range(size):
+            n = start + offset + 1
+            first, last = firsts[offset], lasts[offset]
+            # (n/N)^0.6 spreads early users thinly, so sign-ups per day grow over time
+            created = START_DATE + timedelta(days=int(span_days * (n / max(count, 1)) ** 0.6))
+            yield {
+                "id": f"u{n}",
+                "name": f"{first} {last}",
+                "email": f"{first.lower()}.{last.lower()}{n}@{picked_domains[offset]}",
+                "role": picked_roles[offset],
+                "created_at": created.isoformat(),
+            }
+
+
+def read_users(path: str) -> Iterator[Dict[str, str]]:
+    """Stream users from a JSONL file written by this module"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True, help="JSONL file to write")
+    args = parser.parse_args()
+
+    with open(args.output, "w") as f:
+        for user in generate_users(args.users, args.seed):
+            f.write(json.dumps(user, separators=(",", ":")) + "\n")
+    print(f"Wrote {args.users} users to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Async load generator for the data API and chat endpoint.
+
+Workloads (each runs on its own for --duration seconds with --concurrency
+closed-loop workers):
+    search - GET /users/search with a mix of text, role and pagination filters
+    batch  - POST /users/search/batch (8 searches) and GET /users/by_ids (20 ids)
+    export - page through every user with GET /users/search?limit=100
+    chat   - POST /api/chat with canned questions (needs LLM_PROVIDER=fake
+             on the server unless you want to pay for real LLM calls)
+
+The report (p50/p95/p99, mean, max and RPS per workload) is printed and
+optionally saved as JSON; compare two reports with `python -m benchmarks.compare`.
+
+Usage:
+    # against a running server
+    python -m benchmarks.loadgen --workloads search,batch --concurrency 32 --duration 20
+
+    # start a server with 100k synthetic users and the fake LLM, then run everything
+    python -m benchmarks.loadgen --spawn-api --users 100000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.dataset import FIRST_NAMES, LAST_NAMES
+from benchmarks.report import environment, summarize, write_report
+from launcher import wait_until_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKLOADS = ("search", "batch", "export", "chat")
+ROLES = ("admin", "member", "viewer", "owner")
+CHAT_QUESTIONS = (
+    "Find all admin users",
+    "How many members are there?",
+    "Show me users u{a} and u{b}",
+    "Find users named '{last}'",
+    "List the top 20 members",
+)
+
+
+class Workload:
+    """Builds one request for a workload; `rng` is per worker so runs are reproducible"""
+
+    def __init__(self, name: str, total_users: int, chat_cache: bool):
+        self.name = name
+        self.total_users = max(total_users, 1)
+        self.chat_cache = chat_cache
+
+    def random_search(self, rng: random.Random) -> dict:
+        params = {"limit": rng.choice((10, 10, 10, 50, 100))}
+        kind = rng.random()
+        if kind < 0.5:
+            params["query"] = rng.choice(FIRST_NAMES + LAST_NAMES).lower()[:rng.randint(3, 6)]
+        if 0.3 < kind < 0.8:
+            params["role"] = rng.choice(ROLES)
+        if rng.random() < 0.2:
+            params["offset"] = rng.randint(0, 200)
+        return params
+
+    async def run(self, client: httpx.AsyncClient, rng: random.Random, state: dict) -> httpx.Response:
+        if self.name == "search":
+            return await client.get("/users/search", params=self.random_search(rng))
+        if self.name == "batch":
+            if rng.random() < 0.5:
+                return await client.post(
+                    "/users/search/batch",
+                    json={"searches": [self.random_search(rng) for _ in range(8)]},
+                )
+            ids = [f"u{rng.randint(1, self.total_users)}" for _ in range(20)]
+            return await client.get("/users/by_ids", params={"ids": ids})
+        if self.name == "export":
+            offset = state.get("offset", 0)
+            response = await client.get("/users/search", params={"limit": 100, "offset": offset})
+            state["offset"] = offset + 100 if offset + 100 < self.total_users else 0
+            return response
+        question = rng.choice(CHAT_QUESTIONS).format(
+            a=rng.randint(1, self.total_users),
+            b=rng.randint(1, self.total_users),
+            last=rng.choice(LAST_NAMES).lower(),
+        )
+        return await client.post(
+            "/api/chat",
+            json={"messages": [{"role": "user", "content": question}], "cache": self.chat_cache},
+        )
+
+
+async def run_workload(url: str, workload: Workload, concurrency: int, duration: float, seed: int) -> dict:
+    latencies, errors = [], [0]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def worker(index: int):
+            rng = random.Random(seed * 1000 + index)
+            # Spread export workers across the dataset instead of all reading page 0
+            state = {"offset": (index * workload.total_users // concurrency) // 100 * 100}
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = await workload.run(client, rng, state)
+                    ok = response.status_code == 200 and "error" not in response.json()
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[0] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors[0], elapsed)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_api(users: int, seed: int, fake_latency_ms: float, workers: int) -> tuple:
+    """Start uvicorn with a synthetic dataset and the fake LLM; return (process, url)"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        SYNTHETIC_USERS=str(users),
+        SYNTHETIC_SEED=str(seed),
+        LLM_PROVIDER="fake",
+        FAKE_LLM_LATENCY_MS=str(fake_latency_ms),
+        DATA_API_URL=url,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "FastAPISample:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    if wait_until_ready(f"{url}/readyz", timeout=600, proc=proc):
+        return proc, url
+    if proc.poll() is not None:
+        raise RuntimeError("API process exited during startup")
+    proc.terminate()
+    raise RuntimeError("API did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated subset of " + ", ".join(WORKLOADS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per workload")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chat-cache", action="store_true", help="let chat requests use the response cache")
+    parser.add_argument("--spawn-api", action="store_true", help="start a server with synthetic users and the fake LLM")
+    parser.add_argument("--users", type=int, default=100_000, help="synthetic users for --spawn-api")
+    parser.add_argument("--api-workers", type=int, default=None,
+                        help="uvicorn workers to start with --spawn-api (default 1); otherwise recorded as "
+                             "the worker count of the server under test")
+    parser.add_argument("--fake-llm-latency-ms", type=float, default=20, help="fake LLM delay for --spawn-api")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    if args.spawn_api and args.api_workers is None:
+        args.api_workers = 1
+
+    proc = None
+    url = args.url
+    if args.spawn_api:
+        proc, url = spawn_api(args.users, args.seed, args.fake_llm_latency_ms, args.api_workers)
+    try:
+        status = httpx.get(f"{url}/api/status", timeout=10).json()
+        total_users = status.get("users", 4)
+        report = {
+            "environment": environment(),
+            "config": {
+                "url": url,
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "seed": args.seed,
+                "users": total_users,
+                "llm_provider": status.get("llm_provider"),
+                "spawned_api": args.spawn_api,
+                "api_workers": args.api_workers,
+            },
+            "workloads": {},
+        }
+        for name in workloads:
+            print(f"Running {name} for {args.duration:g}s at concurrency {args.concurrency}...", file=sys.stderr)
+            workload = Workload(name, total_users, args.chat_cache)
+            report["workloads"][name] = asyncio.run(
+                run_workload(url, workload, args.concurrency, args.duration, args.seed)
+            )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
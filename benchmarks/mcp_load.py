@@ -0,0 +1,146 @@
+"""
+Load test: N concurrent MCP clients calling search_users.
+
+Compares the two deployment styles:
+    stdio - every client spawns its own `python MCPSample.py` process
+    http  - every client connects to one shared `MCPSample.py --transport http`
+
+The data API must be running (python FastAPISample.py). For http mode start the
+shared server first, or pass --spawn-server to have this script start it.
+
+Usage:
+    python -m benchmarks.mcp_load --mode stdio --clients 20 --calls 50
+    python -m benchmarks.mcp_load --mode http --clients 20 --calls 50 --spawn-server
+    python -m benchmarks.mcp_load --mode both --clients 20 --calls 50 --output mcp_load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from benchmarks.report import percentile
+from launcher import wait_until_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCHES = [{"role": "admin"}, {"role": "member"}, {"query": "a", "limit": 5}, {}]
+
+
+@asynccontextmanager
+async def open_session(mode: str, url: str):
+    if mode == "stdio":
+        params = StdioServerParameters(
+            command=sys.executable,
+            args=[os.path.join(ROOT, "MCPSample.py")],
+            env=dict(os.environ),
+            cwd=ROOT,
+        )
+        async with stdio_client(params) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                yield session
+    else:
+        async with streamablehttp_client(url) as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                yield session
+
+
+async def run_client(index: int, mode: str, url: str, calls: int, latencies: list, connects: list, errors: list):
+    started = time.perf_counter()
+    try:
+        async with open_session(mode, url) as session:
+            connects.append(time.perf_counter() - started)
+            for i in range(calls):
+                arguments = SEARCHES[(index + i) % len(SEARCHES)]
+                call_started = time.perf_counter()
+                result = await session.call_tool("search_users", arguments)
+                latencies.append(time.perf_counter() - call_started)
+                if result.isError or result.content[0].text.startswith("Error"):
+                    errors.append(result.content[0].text)
+    except Exception as e:
+        errors.append(repr(e))
+
+
+async def run_mode(mode: str, clients: int, calls: int, url: str) -> dict:
+    latencies, connects, errors = [], [], []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(i, mode, url, calls, latencies, connects, errors)
+        for i in range(clients)
+    ])
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "clients": clients,
+        "calls_per_client": calls,
+        "server_processes": clients if mode == "stdio" else 1,
+        "completed_calls": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_seconds": round(elapsed, 3),
+        "calls_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "connect_p50_ms": round(1000 * percentile(connects, 50), 2),
+        "connect_p95_ms": round(1000 * percentile(connects, 95), 2),
+        "call_p50_ms": round(1000 * percentile(latencies, 50), 2),
+        "call_p95_ms": round(1000 * percentile(latencies, 95), 2),
+        "call_p99_ms": round(1000 * percentile(latencies, 99), 2),
+    }
+
+
+def spawn_http_server(port: int) -> subprocess.Popen:
+    """Start a shared MCP server and wait until it accepts connections"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "MCPSample.py"), "--transport", "http", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    if wait_until_ready(f"http://127.0.0.1:{port}/readyz", timeout=15, proc=proc):
+        return proc
+    proc.terminate()
+    raise RuntimeError("MCP HTTP server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["stdio", "http", "both"], default="both")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--spawn-server", action="store_true", help="start the shared HTTP server for http mode")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}/mcp/"
+    modes = ["stdio", "http"] if args.mode == "both" else [args.mode]
+    spawn = args.spawn_server or args.mode == "both"
+
+    reports = []
+    for mode in modes:
+        server = spawn_http_server(args.port) if mode == "http" and spawn else None
+        try:
+            report = asyncio.run(run_mode(mode, args.clients, args.calls, url))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        reports.append(report)
+        print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
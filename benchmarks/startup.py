@@ -0,0 +1,142 @@
+"""
+Startup-time benchmark for both server entry points.
+
+Measures, per run:
+    api   - time until `uvicorn FastAPISample:app` answers /api/status, and the
+            latency of the first and second /api/chat request, for
+            STARTUP_MODE=eager and STARTUP_MODE=lazy (uses the fake LLM)
+    mcp   - time to spawn `python MCPSample.py` over stdio, initialize, and
+            answer the first list_tools
+    imports - the slowest modules from `python -X importtime` for each entry point
+
+Usage:
+    python -m benchmarks.startup --runs 3 --output startup.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from launcher import wait_until_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_profile(module: str, top: int = 10) -> dict:
+    """Run `python -X importtime -c "import module"` and return the slowest imports"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == module), None)
+    slowest = sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top]
+    return {"module": module, "total_ms": total, "slowest_self_ms": slowest}
+
+
+def api_startup(mode: str) -> dict:
+    """Boot the API in the given STARTUP_MODE and time readiness and the first chats"""
+    port = free_port()
+    env = dict(os.environ, STARTUP_MODE=mode, LLM_PROVIDER="fake", FAKE_LLM_LATENCY_MS="0",
+               DATA_API_URL=f"http://127.0.0.1:{port}")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "FastAPISample:app", "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        # Poll at most every 20 ms: the time to readiness is what is being measured
+        if not wait_until_ready(f"{base}/readyz", timeout=60, proc=proc, max_delay=0.02):
+            raise RuntimeError("API did not start")
+        ready = time.perf_counter() - started
+
+        chats = []
+        for _ in range(2):
+            chat_started = time.perf_counter()
+            httpx.post(
+                f"{base}/api/chat",
+                json={"messages": [{"role": "user", "content": "find all admin users"}], "cache": False},
+                timeout=30,
+            ).raise_for_status()
+            chats.append(time.perf_counter() - chat_started)
+        startup = httpx.get(f"{base}/api/status").json().get("startup", {})
+        return {
+            "ready_ms": round(1000 * ready, 1),
+            "first_chat_ms": round(1000 * chats[0], 1),
+            "second_chat_ms": round(1000 * chats[1], 1),
+            "warm_up_timings_ms": startup.get("timings_ms", {}),
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def mcp_startup() -> dict:
+    """Spawn the stdio MCP server and time initialize + first list_tools"""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=["MCPSample.py"], env=dict(os.environ), cwd=ROOT)
+    started = time.perf_counter()
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            initialized = time.perf_counter() - started
+            await session.list_tools()
+            listed = time.perf_counter() - started
+    return {"initialize_ms": round(1000 * initialized, 1), "first_list_tools_ms": round(1000 * listed, 1)}
+
+
+def median_report(runs: list) -> dict:
+    keys = [k for k, v in runs[0].items() if isinstance(v, (int, float))]
+    return {k: round(statistics.median(r[k] for r in runs), 1) for k in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = {"runs": args.runs, "api": {}, "imports": {}}
+    for mode in ("eager", "lazy"):
+        runs = [api_startup(mode) for _ in range(args.runs)]
+        report["api"][mode] = {"median": median_report(runs), "last_warm_up_timings_ms": runs[-1]["warm_up_timings_ms"]}
+    report["mcp_stdio"] = median_report([asyncio.run(mcp_startup()) for _ in range(args.runs)])
+    for module in ("FastAPISample", "MCPSample", "ChatBackend"):
+        report["imports"][module] = import_profile(module)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark the user store backends (in-memory vs SQLite/FTS5) across dataset sizes.
+
+For each size and backend: load time, then each workload run in-process with
+--concurrency concurrent callers:
+    text    - name/email substring search, 3-6 characters (FTS5 trigram path)
+    short   - 2-character search (LIKE fallback on SQLite)
+    role    - role filter with random offsets
+    by_ids  - 20 random ids
+    count   - per-role counts for a text query
+
+Besides latency percentiles and throughput, each workload reports the worst
+event-loop lag seen by a 1 ms ticker: the in-memory store scans on the loop,
+the SQLite store runs queries in its thread pool.
+
+Usage:
+    python -m benchmarks.store_bench --sizes 10000,100000,1000000 --output store.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.dataset import FIRST_NAMES, LAST_NAMES, generate_users
+from benchmarks.report import environment, summarize, write_report
+from UserStore import InMemoryUserStore, SQLiteUserStore
+
+WORKLOADS = ("text", "short", "role", "by_ids", "count")
+ROLES = ("admin", "member", "viewer", "owner")
+
+
+def make_call(store, workload: str, rng: random.Random, size: int):
+    """One store call for `workload` as a coroutine"""
+    fragment = rng.choice(FIRST_NAMES + LAST_NAMES).lower()
+    if workload == "text":
+        start = rng.randint(0, max(0, len(fragment) - 3))
+        return store.search(fragment[start:start + rng.randint(3, 6)], None, 10, 0)
+    if workload == "short":
+        return store.search(fragment[:2], None, 10, 0)
+    if workload == "role":
+        return store.search(None, rng.choice(ROLES), 10, rng.randint(0, 1000))
+    if workload == "by_ids":
+        return store.get_by_ids([f"u{rng.randint(1, size)}" for _ in range(20)])
+    return store.count(fragment[:4], None)
+
+
+async def run_workload(store, workload: str, size: int, operations: int, concurrency: int, seed: int) -> dict:
+    latencies = []
+    max_lag = [0.0]
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag[0] = max(max_lag[0], time.perf_counter() - before - 0.001)
+
+    async def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        for _ in range(operations // concurrency):
+            started = time.perf_counter()
+            await make_call(store, workload, rng, size)
+            latencies.append(time.perf_counter() - started)
+
+    lag_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    result = summarize(latencies, 0, elapsed)
+    result["max_loop_lag_ms"] = round(1000 * max_lag[0], 2)
+    return result
+
+
+async def bench_store(store, size: int, args) -> dict:
+    store.warm_up()
+    results = {}
+    for workload in args.workloads:
+        results[workload] = await run_workload(store, workload, size, args.operations, args.concurrency, args.seed)
+    await store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated dataset sizes")
+    parser.add_argument("--backends", default="memory,sqlite")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--operations", type=int, default=400, help="calls per workload")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--read-connections", type=int, default=4, help="SQLite read pool size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    args.workloads = [w for w in args.workloads.split(",") if w]
+
+    report = {
+        "environment": environment(),
+        "config": {
+            "operations": args.operations,
+            "concurrency": args.concurrency,
+            "read_connections": args.read_connections,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="store_bench_")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for backend in args.backends.split(","):
+            print(f"{backend} with {size} users...", file=sys.stderr)
+            started = time.perf_counter()
+            if backend == "memory":
+                store = InMemoryUserStore([])
+            else:
+                path = os.path.join(db_dir, f"users_{size}.db")
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                store = SQLiteUserStore(path, read_connections=args.read_connections)
+            store.load(generate_users(size, args.seed))
+            entry = {"load_seconds": round(time.perf_counter() - started, 2)}
+            if backend == "sqlite":
+                entry["db_megabytes"] = round(os.path.getsize(path) / 1e6, 1)
+            entry["workloads"] = asyncio.run(bench_store(store, size, args))
+            report["results"][f"{backend}/{size}"] = entry
+
+    write_report(report, args.output)
+
+    print(f"\n{'store':<16} {'workload':<8} {'p50_ms':>8} {'p95_ms':>8} {'rps':>9} {'loop_lag':>9}", file=sys.stderr)
+    for name, entry in report["results"].items():
+        for workload, r in entry["workloads"].items():
+            print(f"{name:<16} {workload:<8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['rps']:>9} {r['max_loop_lag_ms']:>9}",
+                  file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
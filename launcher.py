@@ -8,25 +8,57 @@ Components:
     frontend - Start the server with web frontend (recommended)
     api      - Start the FastAPI backend server only
     mcp      - Start the MCP server (requires API to be running)
+               extra args are passed through, e.g. `mcp --transport http --port 8001`
     chat     - Run the chat backend example (requires API and OPENAI_API_KEY)
     test     - Run system tests
     all      - Show instructions to run all components
+    run-all  - Supervise the API (N uvicorn workers), the MCP server and
+               optional benchmarks in one terminal; see `run-all --help`
 """
 
 import sys
 import subprocess
 import os
+import time
+import signal
+import argparse
+import shlex
 
-def check_api_running():
-    """Check if the FastAPI server is running"""
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def check_api_running(url="http://localhost:8000"):
+    """Check if the FastAPI server is up and finished warming up"""
     import httpx
     try:
-        response = httpx.get("http://localhost:8000/", timeout=2)
+        response = httpx.get(f"{url}/readyz", timeout=2)
         return response.status_code == 200
     except:
         return False
 
 
+def wait_until_ready(url, timeout=60.0, proc=None, should_stop=None, max_delay=1.0):
+    """Poll `url` with exponential backoff (up to `max_delay` seconds) until it answers 200.
+
+    Returns False if `timeout` passes, `proc` exits or `should_stop()` turns true first.
+    """
+    import httpx
+    deadline = time.monotonic() + timeout
+    delay = min(0.05, max_delay)
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False
+        if should_stop is not None and should_stop():
+            return False
+        try:
+            if httpx.get(url, timeout=min(1.0, delay * 4)).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, max_delay)
+    return False
+
+
 def launch_api():
     """Start the FastAPI server"""
     print("Starting FastAPI backend server with web frontend...")
@@ -37,8 +69,8 @@ def launch_api():
     subprocess.run([sys.executable, "FastAPISample.py"])
 
 
-def launch_mcp():
-    """Start the MCP server"""
+def launch_mcp(extra_args=None):
+    """Start the MCP server (stdio by default, or --transport http/sse)"""
     if not check_api_running():
         print("❌ Error: FastAPI server is not running!")
         print("\nPlease start it first:")
@@ -47,11 +79,19 @@ def launch_mcp():
         print("  python FastAPISample.py")
         sys.exit(1)
     
+    extra_args = extra_args or []
+    # Only to pick the message; MCPSample.py parses and validates the arguments itself
+    transport_parser = argparse.ArgumentParser(add_help=False)
+    transport_parser.add_argument("--transport", default=os.environ.get("MCP_TRANSPORT", "stdio"))
+    transport = transport_parser.parse_known_args(extra_args)[0].transport
     print("Starting MCP server...")
-    print("Server will communicate via stdio")
+    if transport in ("http", "sse"):
+        print("Server will accept MCP clients over the network (see MCPSample.py --help)")
+    else:
+        print("Server will communicate via stdio")
     print("Press Ctrl+C to stop")
     print("-" * 60)
-    subprocess.run([sys.executable, "MCPSample.py"])
+    subprocess.run([sys.executable, "MCPSample.py", *extra_args])
 
 
 def launch_chat():
@@ -122,6 +162,205 @@ def show_all_instructions():
     print("="*60 + "\n")
 
 
+class Child:
+    """One supervised process; restarted with exponential backoff if it dies"""
+
+    # A child that stays up this long is considered healthy again and its backoff resets
+    STABLE_SECONDS = 30.0
+    BACKOFF_MIN = 0.5
+    BACKOFF_MAX = 30.0
+    # Readiness polls after a restart: short timeout and growing interval, so a hung
+    # child cannot stall the supervision loop (and crash detection for the others)
+    READY_CHECK_TIMEOUT = 0.1
+    READY_CHECK_MIN = 0.2
+    READY_CHECK_MAX = 2.0
+
+    def __init__(self, name, argv, env=None, ready_url=None, restart=True):
+        self.name = name
+        self.argv = argv
+        self.env = env
+        self.ready_url = ready_url
+        self.restart = restart
+        self.proc = None
+        self.ready = False
+        self.started_at = 0.0
+        self.restart_at = None
+        self.backoff = self.BACKOFF_MIN
+        self.restarts = 0
+        self.ready_check_at = 0.0
+        self.ready_check_delay = self.READY_CHECK_MIN
+
+    def start(self):
+        self.proc = subprocess.Popen(self.argv, cwd=ROOT, env=self.env)
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        self.ready = self.ready_url is None
+        self.ready_check_at = self.started_at
+        self.ready_check_delay = self.READY_CHECK_MIN
+        print(f"▶ {self.name} started (pid {self.proc.pid})")
+
+    def check_ready(self):
+        """Quick readiness check, used after a restart; polls with backoff"""
+        import httpx
+        if self.ready or self.proc is None or self.proc.poll() is not None:
+            return
+        now = time.monotonic()
+        if now < self.ready_check_at:
+            return
+        self.ready_check_at = now + self.ready_check_delay
+        self.ready_check_delay = min(self.ready_check_delay * 2, self.READY_CHECK_MAX)
+        try:
+            self.ready = httpx.get(self.ready_url, timeout=self.READY_CHECK_TIMEOUT).status_code == 200
+        except httpx.HTTPError:
+            return
+        if self.ready:
+            print(f"✓ {self.name} ready after {time.monotonic() - self.started_at:.1f}s")
+
+    def poll(self, stopping=False):
+        """One supervision step: check readiness, schedule or perform a restart.
+
+        Returns the exit code once a child with restart=False has finished, else None.
+        """
+        if self.proc is not None:
+            code = self.proc.poll()
+            if code is None:
+                self.check_ready()
+            elif not self.restart:
+                return code
+            elif not stopping:
+                self.schedule_restart(code)
+        elif self.restart_at is not None and time.monotonic() >= self.restart_at:
+            self.start()
+        return None
+
+    def schedule_restart(self, code):
+        uptime = time.monotonic() - self.started_at
+        if uptime > self.STABLE_SECONDS:
+            self.backoff = self.BACKOFF_MIN
+        print(f"⚠️  {self.name} exited with code {code} after {uptime:.1f}s; restarting in {self.backoff:.1f}s")
+        self.restart_at = time.monotonic() + self.backoff
+        self.backoff = min(self.backoff * 2, self.BACKOFF_MAX)
+        self.restarts += 1
+        self.proc = None
+
+    def stop(self, grace):
+        """SIGTERM (graceful shutdown in uvicorn), then SIGKILL after `grace` seconds"""
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            print(f"⚠️  {self.name} did not stop within {grace:g}s; killing it")
+            self.proc.kill()
+            self.proc.wait()
+        print(f"■ {self.name} stopped")
+
+
+def parse_run_all_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="launcher.py run-all",
+        description="Run the API, the MCP server and optional benchmarks under one supervisor",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="bind address for both servers")
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("API_WORKERS", "1")),
+                        help="uvicorn worker processes for the API")
+    parser.add_argument("--mcp-transport", choices=["http", "sse", "none"], default="http")
+    parser.add_argument("--mcp-port", type=int, default=8001)
+    parser.add_argument("--fake-llm", action="store_true", help="run the API with LLM_PROVIDER=fake")
+    parser.add_argument("--bench", metavar="WORKLOADS",
+                        help="run benchmarks.loadgen with these workloads once ready, then shut down")
+    parser.add_argument("--bench-args", default="", help="extra loadgen arguments, e.g. \"--duration 20 --output bench.json\"")
+    parser.add_argument("--ready-timeout", type=float, default=120.0, help="seconds to wait for each server to become ready")
+    parser.add_argument("--grace", type=float, default=10.0, help="seconds to wait for graceful shutdown")
+    return parser.parse_args(argv)
+
+
+def run_all(argv):
+    """Start everything in dependency order, gate on readiness, restart crashes, stop cleanly"""
+    args = parse_run_all_args(argv)
+    local_host = "127.0.0.1" if args.host in ("0.0.0.0", "::") else args.host
+    api_url = f"http://{local_host}:{args.api_port}"
+    env = dict(os.environ, DATA_API_URL=api_url)
+    if args.fake_llm:
+        env["LLM_PROVIDER"] = "fake"
+
+    children = [Child(
+        "api",
+        [sys.executable, "-m", "uvicorn", "FastAPISample:app", "--host", args.host,
+         "--port", str(args.api_port), "--workers", str(args.workers), "--no-access-log"],
+        env=env,
+        ready_url=f"{api_url}/readyz",
+    )]
+    if args.mcp_transport != "none":
+        children.append(Child(
+            "mcp",
+            [sys.executable, "MCPSample.py", "--transport", args.mcp_transport,
+             "--host", args.host, "--port", str(args.mcp_port)],
+            env=env,
+            ready_url=f"http://{local_host}:{args.mcp_port}/readyz",
+        ))
+    bench = None
+    if args.bench:
+        bench = Child(
+            "bench",
+            [sys.executable, "-m", "benchmarks.loadgen", "--url", api_url, "--workloads", args.bench,
+             "--api-workers", str(args.workers), *shlex.split(args.bench_args)],
+            env=env,
+            restart=False,
+        )
+
+    stopping = []
+
+    def request_stop(signum, frame):
+        if not stopping:
+            print(f"\nReceived {signal.Signals(signum).name}, shutting down...")
+        stopping.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    exit_code = 0
+    started = []
+    try:
+        # Each child waits for the previous one: the MCP server needs the API
+        for child in children:
+            child.start()
+            started.append(child)
+            ready_started = time.monotonic()
+            if not wait_until_ready(child.ready_url, args.ready_timeout, child.proc, lambda: bool(stopping)):
+                if not stopping:
+                    print(f"❌ {child.name} did not become ready (see its output above)")
+                    exit_code = 1
+                return exit_code
+            child.ready = True
+            print(f"✓ {child.name} ready after {time.monotonic() - ready_started:.1f}s ({child.ready_url})")
+        print(f"\n🌐 API: {api_url}   📖 Docs: {api_url}/docs")
+        if args.mcp_transport != "none":
+            print(f"🔌 MCP: http://{local_host}:{args.mcp_port}/" + ("mcp/" if args.mcp_transport == "http" else "sse"))
+        print("Press Ctrl+C to stop\n")
+
+        if bench is not None:
+            bench.start()
+            started.append(bench)
+
+        while not stopping:
+            for child in started:
+                code = child.poll(stopping=bool(stopping))
+                if code is not None:
+                    # One-shot benchmark run: its result decides the exit code
+                    print(f"{child.name} finished with code {code}")
+                    exit_code = code
+                    stopping.append(None)
+                    break
+            time.sleep(0.2)
+        return exit_code
+    finally:
+        for child in reversed(started):
+            child.stop(args.grace)
+
+
 def main():
     """Main launcher function"""
     if len(sys.argv) < 2:
@@ -129,17 +368,18 @@ def main():
         sys.exit(1)
     
     component = sys.argv[1].lower()
-    in ["frontend", "api"]
-    if component == "api":
+    if component in ["frontend", "api"]:
         launch_api()
     elif component == "mcp":
-        launch_mcp()
+        launch_mcp(sys.argv[2:])
     elif component == "chat":
         launch_chat()
     elif component == "test":
         run_tests()
     elif component == "all":
         show_all_instructions()
+    elif component == "run-all":
+        sys.exit(run_all(sys.argv[2:]))
     else:
         print(f"❌ Unknown component: {component}")
         print(__doc__)
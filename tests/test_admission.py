@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ChatBackend
+import FastAPISample
+from AdmissionControl import AdmissionController, AdmissionRejected
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def flaky(statuses):
+    """A blocking SDK call failing with each status in turn, then returning "ok"""
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if len(calls) <= len(statuses):
+            raise UpstreamError(statuses[len(calls) - 1])
+        return "ok"
+
+    return fn, calls
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    controller = AdmissionController("test", max_concurrency=1)
+    gate = threading.Event()
+    order = []
+
+    async def scenario():
+        first = asyncio.create_task(controller.call(gate.wait))
+        await asyncio.sleep(0.01)
+        waiters = [
+            asyncio.create_task(controller.call(order.append, name, priority=priority))
+            for name, priority in (("new-1", 1), ("new-2", 1), ("follow-up", 0))
+        ]
+        await asyncio.sleep(0.01)
+        assert controller.queue_depth == 3
+        gate.set()
+        await asyncio.gather(first, *waiters)
+
+    asyncio.run(scenario())
+    assert order == ["follow-up", "new-1", "new-2"]
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    controller = AdmissionController("test", max_concurrency=1, max_queue=1)
+    gate = threading.Event()
+
+    async def scenario():
+        busy = asyncio.create_task(controller.call(gate.wait))
+        queued = asyncio.create_task(controller.call(lambda: None))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.call(lambda: None)
+        gate.set()
+        await asyncio.gather(busy, queued)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.retry_after_header == "1"
+    assert controller.rejected == 1
+
+
+def test_chat_endpoint_answers_503_with_retry_after(monkeypatch):
+    async def shed(*args, **kwargs):
+        raise AdmissionRejected("openai queue is full", 2.5)
+
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setattr(ChatBackend, "handle_chat", shed)
+    response = TestClient(FastAPISample.app).post("/api/chat", json={"messages": [{"role": "user", "content": "hi"}]})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+
+def test_retries_back_off_and_take_rate_limit_tokens():
+    controller = AdmissionController("test", rate_per_sec=20, burst=1, backoff_base=0.001)
+    fn, calls = flaky([429, 503])
+
+    assert asyncio.run(controller.call(fn)) == "ok"
+    assert controller.retries == 2
+    # Every attempt waited for a token: at most one per 50 ms after the burst
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert all(gap >= 0.045 for gap in gaps), gaps
+
+
+def test_persistent_429_is_rejected_not_retried_forever():
+    controller = AdmissionController("test", max_retries=2, backoff_base=0.001)
+    fn, calls = flaky([429] * 10)
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(controller.call(fn))
+    assert len(calls) == 3
+
+
+def test_non_retryable_errors_propagate():
+    controller = AdmissionController("test", backoff_base=0.001)
+    fn, calls = flaky([400])
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(controller.call(fn))
+    assert len(calls) == 1
+
+
+def test_slot_is_held_until_an_abandoned_call_returns():
+    controller = AdmissionController("test", max_concurrency=1)
+    gate = threading.Event()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(controller.call(gate.wait), timeout=0.05)
+        # The worker thread is still running, so nobody else may start
+        assert controller.stats()["in_flight"] == 1
+        assert controller.abandoned == 1
+        waiter = asyncio.create_task(controller.call(lambda: "next"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        gate.set()
+        assert await asyncio.wait_for(waiter, timeout=1) == "next"
+
+    asyncio.run(scenario())
+    assert controller.stats()["in_flight"] == 0
@@ -0,0 +1,102 @@
+import asyncio
+import sqlite3
+
+import ChatCache
+from ChatCache import ResponseCache, make_cache_key
+from UserStore import InMemoryUserStore, SQLiteUserStore
+
+MESSAGES = [{"role": "user", "content": "Show me all  admins"}]
+
+
+class Clock:
+    """Stand-in for time.time() inside ChatCache"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_key_ignores_case_and_whitespace():
+    assert make_cache_key(MESSAGES, "openai", "m") == make_cache_key(
+        [{"role": "User", "content": "show me all admins "}], "openai", "m"
+    )
+
+
+def test_key_changes_with_everything_that_changes_the_answer():
+    base = make_cache_key(MESSAGES, "openai", "m", "a")
+    assert base != make_cache_key([{"role": "user", "content": "show me members"}], "openai", "m", "a")
+    assert base != make_cache_key(MESSAGES, "gemini", "m", "a")
+    assert base != make_cache_key(MESSAGES, "openai", "other", "a")
+    assert base != make_cache_key(MESSAGES, "openai", "m", "b")
+
+
+def test_store_source_identifies_the_dataset(tmp_path):
+    users = [{"id": "u1", "name": "A", "email": "a@x.com", "role": "admin", "created_at": "2024-01-01"}]
+    other = [dict(users[0], name="B")]
+    memory = InMemoryUserStore(list(users))
+    assert memory.source == InMemoryUserStore(list(users)).source
+    assert memory.source != InMemoryUserStore(list(other)).source
+
+    path = str(tmp_path / "users.db")
+    store = SQLiteUserStore(path, seed=users)
+    assert store.source == memory.source
+    store.load(other, "synthetic:1:1")
+    asyncio.run(store.close())
+    # Survives a restart, unlike a per-process counter
+    assert SQLiteUserStore(path).source == "synthetic:1:1"
+
+
+def test_memory_entries_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ChatCache, "time", clock)
+    cache = ResponseCache(ttl_seconds=10)
+
+    async def scenario():
+        await cache.put("k", {"content": "hi"}, latency=0.5, llm_calls=2, tokens=7)
+        clock.now += 9
+        assert await cache.get("k") == {"content": "hi"}
+        clock.now += 2
+        assert await cache.get("k") is None
+
+    asyncio.run(scenario())
+    assert (cache.hits, cache.misses, cache.llm_calls_saved) == (1, 1, 2)
+
+
+def test_lru_bound():
+    cache = ResponseCache(max_entries=2)
+
+    async def scenario():
+        for key in ("a", "b"):
+            await cache.put(key, {"content": key}, latency=0, llm_calls=1)
+        await cache.get("a")
+        await cache.put("c", {"content": "c"}, latency=0, llm_calls=1)
+        return [await cache.get(key) is not None for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_disk_tier_survives_restart_and_purges_expired_rows(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ChatCache, "time", clock)
+    path = str(tmp_path / "cache.db")
+
+    async def fill():
+        cache = ResponseCache(ttl_seconds=10, db_path=path)
+        await cache.put("old", {"content": "old"}, latency=0, llm_calls=1)
+        clock.now += 5
+        await cache.put("new", {"content": "new"}, latency=0, llm_calls=1)
+
+    asyncio.run(fill())
+    clock.now += 6
+
+    restarted = ResponseCache(ttl_seconds=10, db_path=path)
+    assert restarted.expired_purged == 1
+    assert asyncio.run(restarted.get("new")) == {"content": "new"}
+    assert restarted.disk_hits == 1
+
+    clock.now += 100
+    asyncio.run(restarted.put("newest", {"content": "x"}, latency=0, llm_calls=1))
+    keys = [row[0] for row in sqlite3.connect(path).execute("SELECT key FROM chat_cache")]
+    assert keys == ["newest"]
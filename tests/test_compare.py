@@ -0,0 +1,44 @@
+from benchmarks.compare import compare
+
+
+def workload(p50=10.0, p95=20.0, p99=30.0, rps=100.0, errors=0):
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "rps": rps, "errors": errors}
+
+
+def regressions(baseline, candidate, threshold=10.0):
+    rows = compare({"workloads": baseline}, {"workloads": candidate}, threshold)
+    return {(r["workload"], r["metric"]) for r in rows if r["regressed"]}
+
+
+def test_changes_within_the_threshold_pass():
+    assert regressions({"search": workload()}, {"search": workload(p50=10.9, rps=91)}) == set()
+
+
+def test_slower_latency_and_lower_throughput_regress():
+    candidate = {"search": workload(p95=23, rps=85), "chat": workload(p99=50)}
+    assert regressions({"search": workload(), "chat": workload()}, candidate) == {
+        ("search", "p95_ms"), ("search", "rps"), ("chat", "p99_ms"),
+    }
+
+
+def test_faster_is_not_a_regression():
+    assert regressions({"search": workload()}, {"search": workload(p50=1, p95=2, p99=3, rps=1000)}) == set()
+
+
+def test_new_errors_regress():
+    assert regressions({"search": workload(errors=2)}, {"search": workload(errors=3)}) == {("search", "errors")}
+    assert regressions({"search": workload(errors=2)}, {"search": workload(errors=2)}) == set()
+
+
+def test_missing_workload_regresses():
+    baseline = {"search": workload(), "chat": workload()}
+    assert regressions(baseline, {"search": workload()}) == {("chat", "missing")}
+
+
+def test_new_workload_is_not_compared():
+    rows = compare({"workloads": {}}, {"workloads": {"export": workload()}}, 10.0)
+    assert rows == []
+
+
+def test_zero_baseline_does_not_divide_by_zero():
+    assert regressions({"search": workload(p50=0)}, {"search": workload(p50=5)}) == set()
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import FakeLLM
+from FakeLLM import FakeLLMClient, _call_id, plan_tool_call, summarize_tool_result
+
+ALL_TOOLS = {"search_users", "get_users_by_ids", "count_users"}
+TOOLS = [{"type": "function", "function": {"name": name}} for name in sorted(ALL_TOOLS)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("How many admins are there?", ("count_users", {"role": "admin"})),
+    ("count the members", ("count_users", {"role": "member"})),
+    ("number of users", ("count_users", {})),
+    ("Show me u1 and U42", ("get_users_by_ids", {"ids": ["u1", "u42"]})),
+    ("Find all admin users", ("search_users", {"role": "admin"})),
+    ("find users named alice", ("search_users", {"query": "alice"})),
+    ("search for 'smith' members, top 5", ("search_users", {"role": "member", "query": "smith", "limit": 5})),
+    ("who has bob@example.com?", ("search_users", {"query": "bob@example.com"})),
+    ("list the first 500 users", ("search_users", {"limit": 100})),
+    ("hello there", None),
+])
+def test_plan_tool_call(text, expected):
+    assert plan_tool_call(text, ALL_TOOLS) == expected
+
+
+def test_plan_only_uses_offered_tools():
+    assert plan_tool_call("how many admins?", {"search_users"}) == ("search_users", {"role": "admin"})
+    assert plan_tool_call("show u1", {"search_users"}) == ("search_users", {})
+    assert plan_tool_call("find users", set()) is None
+
+
+def test_call_id_is_deterministic():
+    messages = [{"role": "user", "content": "find admins"}]
+    assert _call_id(messages) == _call_id([dict(m) for m in messages])
+    assert _call_id(messages).startswith("call_") and len(_call_id(messages)) == 17
+    assert _call_id(messages) != _call_id([{"role": "user", "content": "find members"}])
+
+
+def test_summarize_tool_results():
+    alice = {"id": "u1", "name": "Alice", "role": "admin"}
+    search = {"summary": "Found 1 users", "total": 1, "returned": 1, "users": [alice]}
+    by_ids = {"summary": "Found 1 of 2 requested users", "returned": 1, "users": [alice], "missing": ["u9"]}
+    count = {"summary": "3 users (admin: 1, member: 2)", "total": 3, "by_role": {"admin": 1, "member": 2}}
+    assert summarize_tool_result(json.dumps(search)) == "Found 1 users. Showing 1: Alice (admin)."
+    assert summarize_tool_result(json.dumps(by_ids)) == "Found 1 of 2 requested users. Showing 1: Alice (admin)."
+    assert summarize_tool_result(json.dumps(count)) == "There are 3 users (admin: 1, member: 2)."
+    assert summarize_tool_result(json.dumps({"summary": "Found 0 users", "users": []})) == (
+        "I couldn't find any matching users."
+    )
+    assert summarize_tool_result("not json") == "The search tool returned an unreadable result."
+
+
+def create(text, stream=False, **kwargs):
+    client = FakeLLMClient(latency_ms=0, tokens_per_sec=0)
+    return client.chat.completions.create(
+        model="fake", messages=[{"role": "user", "content": text}], tools=TOOLS, stream=stream, **kwargs
+    )
+
+
+def test_tool_call_then_summary():
+    response = create("find admin users")
+    choice = response.choices[0]
+    assert choice.finish_reason == "tool_calls" and choice.message.content is None
+    call = choice.message.tool_calls[0]
+    assert (call.function.name, json.loads(call.function.arguments)) == ("search_users", {"role": "admin"})
+
+    client = FakeLLMClient(latency_ms=0, tokens_per_sec=0)
+    result = {"summary": "Found 0 users", "users": []}
+    response = client.chat.completions.create(model="fake", messages=[
+        {"role": "user", "content": "find admin users"},
+        {"role": "tool", "tool_call_id": call.id, "content": json.dumps(result)},
+    ])
+    assert response.choices[0].finish_reason == "stop"
+    assert response.choices[0].message.content == "I couldn't find any matching users."
+    assert response.usage.total_tokens == response.usage.prompt_tokens + response.usage.completion_tokens
+
+
+def test_timeout_raises(monkeypatch):
+    slept = []
+    monkeypatch.setattr(FakeLLM.time, "sleep", slept.append)
+    client = FakeLLMClient(latency_ms=500, tokens_per_sec=0)
+    with pytest.raises(TimeoutError):
+        client.chat.completions.create(model="fake", messages=[{"role": "user", "content": "hi"}], timeout=0.1)
+    assert slept == [0.1]
+    # Within the timeout the call completes after the configured latency
+    client.chat.completions.create(model="fake", messages=[{"role": "user", "content": "hi"}], timeout=1)
+    assert slept == [0.1, 0.5]
+
+
+def test_stream_text():
+    chunks = list(create("hello there", stream=True))
+    text = "".join(c.choices[0].delta.content for c in chunks[:-1])
+    assert text == "You said: hello there"
+    assert len(chunks) == 5
+    assert [c.choices[0].finish_reason for c in chunks] == [None] * 4 + ["stop"]
+    assert chunks[-1].choices[0].delta.content is None
+
+
+def test_stream_tool_call():
+    chunks = list(create("how many members?", stream=True))
+    assert [c.choices[0].finish_reason for c in chunks] == [None, "tool_calls"]
+    delta = chunks[0].choices[0].delta
+    assert delta.content is None
+    (call,) = delta.tool_calls
+    assert call.index == 0 and call.id == _call_id([{"role": "user", "content": "how many members?"}])
+    assert (call.function.name, json.loads(call.function.arguments)) == ("count_users", {"role": "member"})
@@ -0,0 +1,137 @@
+import subprocess
+import sys
+import time
+
+import httpx
+
+import launcher
+from launcher import Child
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def fast_child(code, **kwargs):
+    child = Child("test", python(code), **kwargs)
+    child.BACKOFF_MIN = 0.05
+    child.backoff = child.BACKOFF_MIN
+    return child
+
+
+def supervise(child, seconds):
+    """Run the supervision loop for a while; returns the start times seen"""
+    starts = []
+    deadline = time.monotonic() + seconds
+    child.start()
+    starts.append(child.started_at)
+    while time.monotonic() < deadline:
+        child.poll()
+        if child.started_at != starts[-1]:
+            starts.append(child.started_at)
+        time.sleep(0.005)
+    child.stop(1)
+    return starts
+
+
+def test_crashing_child_is_restarted_with_doubling_backoff():
+    child = fast_child("import sys; sys.exit(3)")
+    starts = supervise(child, 1.2)
+    assert child.restarts >= 4
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    # Each gap is the backoff (0.05, 0.1, 0.2, 0.4, ...) plus the child's own runtime
+    for i, gap in enumerate(gaps[:4]):
+        assert gap >= 0.05 * 2 ** i
+    assert child.backoff == 0.05 * 2 ** child.restarts
+
+
+def test_backoff_resets_after_a_stable_run_and_is_capped():
+    child = fast_child("import sys; sys.exit(1)")
+    child.start()
+    child.proc.wait()
+    child.backoff = child.BACKOFF_MAX
+    child.schedule_restart(1)
+    assert child.backoff == child.BACKOFF_MAX
+    assert child.restart_at - time.monotonic() > child.BACKOFF_MAX - 1
+
+    child.start()
+    child.proc.wait()
+    child.started_at -= child.STABLE_SECONDS + 1
+    child.schedule_restart(1)
+    # Restarted after the minimum delay; the next crash waits twice as long
+    assert child.restart_at - time.monotonic() <= child.BACKOFF_MIN
+    assert child.backoff == 2 * child.BACKOFF_MIN
+
+
+def test_finished_one_shot_child_reports_its_exit_code():
+    child = Child("bench", python("import sys; sys.exit(7)"), restart=False)
+    child.start()
+    child.proc.wait()
+    assert child.poll() == 7
+    assert child.restarts == 0
+
+
+def test_no_restart_while_stopping():
+    child = fast_child("pass")
+    child.start()
+    child.proc.wait()
+    assert child.poll(stopping=True) is None
+    assert child.restart_at is None and child.restarts == 0
+
+
+def test_stop_terminates_gracefully():
+    child = Child("sleeper", python("import time; time.sleep(30)"))
+    child.start()
+    started = time.monotonic()
+    child.stop(grace=5)
+    assert child.proc.returncode == -15
+    assert time.monotonic() - started < 5
+
+
+def test_stop_kills_a_child_that_ignores_sigterm(tmp_path):
+    marker = tmp_path / "ready"
+    child = Child("stubborn", python(
+        "import pathlib, signal, sys, time\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        f"pathlib.Path({str(marker)!r}).touch()\n"
+        "time.sleep(30)\n"
+    ))
+    child.start()
+    deadline = time.monotonic() + 10
+    while not marker.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    started = time.monotonic()
+    child.stop(grace=0.3)
+    assert child.proc.returncode == -9
+    assert 0.3 <= time.monotonic() - started < 5
+
+
+def test_readiness_polls_back_off_with_a_short_timeout(monkeypatch):
+    calls = []
+
+    def hung_get(url, timeout):
+        calls.append(timeout)
+        raise httpx.ReadTimeout("hung", request=None)
+
+    monkeypatch.setattr(httpx, "get", hung_get)
+    child = Child("api", python("import time; time.sleep(30)"), ready_url="http://127.0.0.1:9/readyz")
+    child.start()
+    try:
+        for _ in range(50):
+            child.check_ready()
+        # One check per interval, not one per supervision tick
+        assert calls == [Child.READY_CHECK_TIMEOUT]
+        child.ready_check_at = 0
+        child.check_ready()
+        assert len(calls) == 2 and child.ready_check_delay == 4 * Child.READY_CHECK_MIN
+        assert not child.ready
+    finally:
+        child.stop(1)
+
+
+def test_wait_until_ready_gives_up_when_the_process_exits():
+    proc = subprocess.Popen(python("pass"))
+    proc.wait()
+    started = time.monotonic()
+    assert not launcher.wait_until_ready("http://127.0.0.1:9/readyz", timeout=10, proc=proc)
+    assert time.monotonic() - started < 1
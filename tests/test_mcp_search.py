@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import httpx
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import MCPSample
+
+USERS = [
+    {"id": f"u{i}", "name": f"User {i}", "email": f"user{i}@example.com", "role": "member", "created_at": "2024-01-01"}
+    for i in range(1, 131)
+]
+
+
+def data_api(requests):
+    """MockTransport handler serving /users/search over USERS"""
+    def handler(request: httpx.Request):
+        requests.append(request)
+        params = request.url.params
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 10))
+        return httpx.Response(200, json={"total": len(USERS), "items": USERS[offset:offset + limit]})
+    return handler
+
+
+def call(arguments, requests, progress=None):
+    async def scenario():
+        MCPSample._http_client = httpx.AsyncClient(base_url="http://data-api", transport=httpx.MockTransport(data_api(requests)))
+        MCPSample._http_client_loop = asyncio.get_running_loop()
+        try:
+            async with create_connected_server_and_client_session(MCPSample.app) as session:
+                async def on_progress(done, total, message):
+                    progress.append((done, total))
+                result = await session.call_tool(
+                    "search_users", arguments, progress_callback=on_progress if progress is not None else None
+                )
+                return [json.loads(item.text) if item.text.startswith("{") else item.text for item in result.content]
+        finally:
+            await MCPSample.close_http_client()
+
+    return asyncio.run(scenario())
+
+
+def test_large_page_is_one_fetch_split_into_chunks(monkeypatch):
+    monkeypatch.setattr(MCPSample, "MCP_CHUNK_SIZE", 25)
+    requests, progress = [], []
+    summary, *chunks = call({"limit": 60, "offset": 10}, requests, progress)
+
+    assert len(requests) == 1
+    assert summary["returned"] == 60 and summary["chunks"] == 3
+    assert [c["offset"] for c in chunks] == [10, 35, 60]
+    assert [u["id"] for c in chunks for u in c["users"]] == [u["id"] for u in USERS[10:70]]
+    assert progress == [(70, 130)]
+
+    # The cursor continues the same search where this page ended
+    assert MCPSample.decode_cursor(summary["next_cursor"])["offset"] == 70
+
+
+def test_small_page_keeps_the_single_blob_shape():
+    requests = []
+    (result,) = call({"limit": 5, "offset": 128}, requests)
+    assert result["returned"] == 2
+    assert [u["id"] for u in result["users"]] == ["u129", "u130"]
+    assert "next_cursor" not in result
+
+
+def test_cursor_resumes_and_accepts_a_new_limit():
+    cursor = MCPSample.encode_cursor(MCPSample.SearchUsersInput(query="user", limit=10, offset=40))
+    requests = []
+    (result,) = call({"cursor": cursor, "limit": 3, "query": "user"}, requests)
+    assert [u["id"] for u in result["users"]] == ["u41", "u42", "u43"]
+    assert dict(requests[0].url.params) == {"query": "user", "limit": "3", "offset": "40"}
+
+
+def test_cursor_for_a_different_search_is_rejected():
+    cursor = MCPSample.encode_cursor(MCPSample.SearchUsersInput(role="admin", offset=10))
+    requests = []
+    (result,) = call({"cursor": cursor, "role": "member"}, requests)
+    assert result.startswith("Error: cursor continues a search with role='admin'")
+    assert not requests
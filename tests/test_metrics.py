@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+
+import FastAPISample
+import Metrics
+
+
+def bucket_counts(histogram):
+    """le label -> cumulative count, from the rendered text"""
+    counts = {}
+    for line in histogram.render():
+        if "_bucket{" in line:
+            labels, value = line.rsplit(" ", 1)
+            counts[labels.split('le="')[1].rstrip('"}')] = int(value)
+    return counts
+
+
+def test_bucket_upper_bounds_are_inclusive():
+    histogram = Metrics.Histogram("test_seconds", "test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.1000001, 1.0, 5.0):
+        histogram.observe(value)
+    assert bucket_counts(histogram) == {"0.1": 2, "1": 4, "+Inf": 5}
+
+
+def test_histogram_text_format():
+    histogram = Metrics.Histogram("stage_seconds", "Time per stage", ("stage",), buckets=(0.01, 0.1))
+    histogram.observe(0.004, "query")
+    histogram.observe(0.25, "query")
+    histogram.observe(0.05, 'se"ri\\al')
+
+    assert histogram.render() == [
+        "# HELP stage_seconds Time per stage",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="query",le="0.01"} 1',
+        'stage_seconds_bucket{stage="query",le="0.1"} 1',
+        'stage_seconds_bucket{stage="query",le="+Inf"} 2',
+        'stage_seconds_sum{stage="query"} 0.254000',
+        'stage_seconds_count{stage="query"} 2',
+        'stage_seconds_bucket{stage="se\\"ri\\\\al",le="0.01"} 0',
+        'stage_seconds_bucket{stage="se\\"ri\\\\al",le="0.1"} 1',
+        'stage_seconds_bucket{stage="se\\"ri\\\\al",le="+Inf"} 1',
+        'stage_seconds_sum{stage="se\\"ri\\\\al"} 0.050000',
+        'stage_seconds_count{stage="se\\"ri\\\\al"} 1',
+    ]
+
+
+def test_counter_values_are_exact():
+    counter = Metrics.Counter("lookups_total", "Lookups", ("result",))
+    counter.inc("hit", amount=1234567)
+    counter.inc("miss", amount=0.5)
+    assert counter.render()[2:] == ['lookups_total{result="hit"} 1234567', 'lookups_total{result="miss"} 0.5']
+
+
+def test_disabled_metrics_record_nothing():
+    histogram = Metrics.Histogram("off_seconds", "test")
+    Metrics.set_enabled(False)
+    try:
+        histogram.observe(1.0)
+    finally:
+        Metrics.set_enabled(True)
+    assert histogram.render() == ["# HELP off_seconds test", "# TYPE off_seconds histogram"]
+
+
+def test_metrics_endpoint():
+    client = TestClient(FastAPISample.app)
+    client.get("/users/search", params={"query": "alice"})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == Metrics.CONTENT_TYPE
+    body = response.text
+    assert body.endswith("\n")
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/search",status="200"}' in body
+    for stage in ("filter", "paginate", "wait", "serialize"):
+        assert f'search_stage_duration_seconds_count{{stage="{stage}"}}' in body
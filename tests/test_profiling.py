@@ -0,0 +1,95 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import Profiling
+
+
+def stack(*frames):
+    """Fake frame chain from (path, function) pairs, outermost first"""
+    frame = None
+    for lineno, (path, function) in enumerate(frames, start=1):
+        frame = SimpleNamespace(f_code=SimpleNamespace(co_filename=path, co_name=function), f_lineno=lineno, f_back=frame)
+    return frame
+
+
+LIB = os.path.join(os.sep, "usr", "lib", "python3.11")
+APP = os.path.join(Profiling.ROOT, "FastAPISample.py")
+UVICORN = (os.path.join(LIB, "site-packages", "uvicorn", "server.py"), "run")
+
+
+def test_idle_loop_is_recognised_for_the_default_loop_and_uvloop():
+    selector = stack((APP, "<module>"), UVICORN, (os.path.join(LIB, "asyncio", "base_events.py"), "_run_once"),
+                     (os.path.join(LIB, "selectors.py"), "select"))
+    uvloop = stack((APP, "<module>"), UVICORN, (os.path.join(LIB, "asyncio", "runners.py"), "run"))
+    assert Profiling._summarize_stack(selector) == Profiling.IDLE
+    assert Profiling._summarize_stack(uvloop) == Profiling.IDLE
+
+
+def test_busy_stacks_show_repo_frames_or_the_library_frame():
+    runner = (os.path.join(LIB, "asyncio", "runners.py"), "run")
+    ours = stack(runner, (os.path.join(Profiling.ROOT, "UserStore.py"), "search"),
+                 (os.path.join(Profiling.ROOT, "UserStore.py"), "_filter"))
+    library = stack(runner, (os.path.join(LIB, "site-packages", "starlette", "routing.py"), "handle"))
+    assert Profiling._summarize_stack(ours) == "UserStore._filter:3 < UserStore.search:2"
+    assert Profiling._summarize_stack(library) == "<routing.py:handle>"
+
+
+def profiled(monkeypatch, tmp_path, app, query_string=b"", headers=()):
+    """Run one request through ProfilingMiddleware; returns the messages sent"""
+    monkeypatch.setattr(Profiling, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(Profiling, "PROFILE_DIR", str(tmp_path))
+    middleware = Profiling.ProfilingMiddleware(app, paths=("/p",))
+    scope = {"type": "http", "method": "GET", "path": "/p", "query_string": query_string, "headers": list(headers)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def body_app(*chunks):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def test_profiled_response_carries_file_and_time(monkeypatch, tmp_path):
+    sent = profiled(monkeypatch, tmp_path, body_app(b"done"), headers=[(b"x-profile-token", b"s3cret")])
+    headers = dict(sent[0]["headers"])
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+    assert (tmp_path / headers[b"x-profile-file"].decode()).is_file()
+    assert float(headers[b"x-profile-time-ms"]) >= 0
+
+
+def test_streamed_response_sends_start_before_the_first_chunk(monkeypatch, tmp_path):
+    sent = profiled(monkeypatch, tmp_path, body_app(b"a", b"b", b"c"), headers=[(b"x-profile-token", b"s3cret")])
+    assert [m["type"] for m in sent] == ["http.response.start"] + ["http.response.body"] * 3
+    headers = dict(sent[0]["headers"])
+    assert b"x-profile-time-ms" not in headers
+    assert (tmp_path / headers[b"x-profile-file"].decode()).is_file()
+
+
+def test_query_token_is_ignored_and_redacted(monkeypatch, tmp_path):
+    # A token in the URL would end up in access logs, so only the header counts
+    sent = profiled(monkeypatch, tmp_path, body_app(b"done"), query_string=b"profile=s3cret")
+    assert b"x-profile-file" not in dict(sent[0]["headers"])
+    assert Profiling._redacted_query({"query_string": b"query=x&profile=s3cret"}) == "query=x"
+
+
+def test_only_the_newest_profiles_are_kept(monkeypatch, tmp_path):
+    monkeypatch.setattr(Profiling, "PROFILE_MAX_FILES", 2)
+    names = []
+    for i in range(4):
+        sent = profiled(monkeypatch, tmp_path, body_app(b"done"), headers=[(b"x-profile-token", b"s3cret")])
+        names.append(dict(sent[0]["headers"])[b"x-profile-file"].decode())
+        path = tmp_path / names[-1]
+        os.utime(path, (i, i))  # distinct mtimes, oldest first
+    assert sorted(p.name for p in tmp_path.glob("*.prof")) == sorted(names[-2:])
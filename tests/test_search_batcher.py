@@ -0,0 +1,165 @@
+import asyncio
+import gc
+
+from SearchBatcher import SearchBatcher
+
+
+def run(coro):
+    """asyncio.run, failing the test if the loop reports an unhandled error"""
+    errors = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        result = await coro()
+        await asyncio.sleep(0.01)
+        return result
+
+    result = asyncio.run(main())
+    assert not errors, errors
+    return result
+
+
+def echo_batches(batches):
+    async def send_batch(searches, timeout):
+        batches.append(searches)
+        return [{"total": 1, "items": [search]} for search in searches]
+    return send_batch
+
+
+def test_concurrent_searches_share_one_batch_and_get_their_own_results():
+    batches = []
+    batcher = SearchBatcher(echo_batches(batches), window_ms=5)
+    searches = [{"query": "a"}, {"role": "admin"}, {"query": "a"}, {"query": "b", "limit": 5}]
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.submit(s) for s in searches])
+
+    results = run(scenario)
+    assert [r["items"][0] for r in results] == searches
+    # The duplicate search is sent once
+    assert batches == [[{"query": "a"}, {"role": "admin"}, {"query": "b", "limit": 5}]]
+    assert batcher.deduplicated == 1
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    batches = []
+    batcher = SearchBatcher(echo_batches(batches), window_ms=10_000, max_batch=2)
+
+    async def scenario():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit({"query": "a"}), batcher.submit({"query": "b"})), timeout=1
+        )
+
+    run(scenario)
+    assert len(batches) == 1
+
+
+def test_errors_reach_every_caller():
+    async def send_batch(searches, timeout):
+        raise ConnectionError("data API down")
+
+    batcher = SearchBatcher(send_batch, window_ms=1)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.submit({"query": "a"}), batcher.submit({"query": "b"}), return_exceptions=True
+        )
+
+    assert [type(r) for r in run(scenario)] == [ConnectionError, ConnectionError]
+
+
+def test_short_result_list_fails_every_caller_instead_of_hanging():
+    async def send_batch(searches, timeout):
+        return [{"total": 0, "items": []}]
+
+    batcher = SearchBatcher(send_batch, window_ms=1)
+
+    async def scenario():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit({"query": "a"}), batcher.submit({"query": "b"}), return_exceptions=True),
+            timeout=1,
+        )
+
+    results = run(scenario)
+    assert all(isinstance(r, RuntimeError) for r in results), results
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    batcher = SearchBatcher(echo_batches([]), window_ms=5)
+
+    async def scenario():
+        impatient = asyncio.create_task(batcher.submit({"query": "a"}))
+        patient = asyncio.create_task(batcher.submit({"query": "a"}))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert run(scenario)["items"] == [{"query": "a"}]
+
+
+def test_error_with_no_one_left_waiting_is_not_reported_as_unhandled():
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def send_batch(searches, timeout):
+            await gate.wait()
+            raise ConnectionError("data API down")
+
+        batcher = SearchBatcher(send_batch, window_ms=1)
+        caller = asyncio.create_task(batcher.submit({"query": "a"}))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.sleep(0.01)
+        del caller
+        gc.collect()
+
+    run(scenario)
+
+
+def test_batch_request_gets_the_tightest_callers_deadline():
+    timeouts = []
+
+    async def send_batch(searches, timeout):
+        timeouts.append(timeout)
+        return [{"total": 0, "items": []} for _ in searches]
+
+    batcher = SearchBatcher(send_batch, window_ms=5)
+
+    async def scenario():
+        await asyncio.gather(
+            batcher.submit({"query": "a"}, timeout=10),
+            batcher.submit({"query": "b"}, timeout=1),
+            batcher.submit({"query": "a"}, timeout=0.5),
+            batcher.submit({"query": "c"}),
+        )
+        await batcher.submit({"query": "d"})
+
+    run(scenario)
+    assert 0.4 < timeouts[0] <= 0.5
+    assert timeouts[1] is None
+
+
+def test_batcher_holds_its_send_tasks_until_they_finish():
+    release = asyncio.Event()
+
+    async def send_batch(searches, timeout):
+        await release.wait()
+        return [{"total": 0, "items": []} for _ in searches]
+
+    batcher = SearchBatcher(send_batch, window_ms=1)
+
+    async def scenario():
+        caller = asyncio.ensure_future(batcher.submit({"query": "a"}))
+        await asyncio.sleep(0.02)
+        # The loop keeps only weak references to tasks; the batcher must keep a strong one
+        in_flight = set(batcher._tasks)
+        gc.collect()
+        release.set()
+        await caller
+        return in_flight
+
+    in_flight = run(scenario)
+    assert len(in_flight) == 1 and all(task.done() for task in in_flight)
+    assert batcher._tasks == set()
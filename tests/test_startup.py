@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import FastAPISample
+from UserStore import SQLiteUserStore
+
+
+@pytest.fixture
+def startup(monkeypatch, tmp_path):
+    """Fresh startup state, with a SQLite store in a temp dir and the fake LLM"""
+    monkeypatch.setenv("USER_STORE", "sqlite")
+    monkeypatch.setenv("USER_STORE_PATH", str(tmp_path / "users.db"))
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.delenv("USERS_FILE", raising=False)
+    monkeypatch.delenv("SYNTHETIC_USERS", raising=False)
+    monkeypatch.setattr(FastAPISample, "_store", None)
+    monkeypatch.setattr(FastAPISample, "STARTUP_TIMINGS", {})
+
+    def start(mode):
+        monkeypatch.setattr(FastAPISample, "STARTUP_MODE", mode)
+        return TestClient(FastAPISample.app)
+    return start
+
+
+def test_eager_mode_warms_up_before_serving(startup):
+    with startup("eager") as client:
+        assert isinstance(FastAPISample._store, SQLiteUserStore)
+        assert FastAPISample._store._executor is not None  # read pool opened by warm-up
+        timings = FastAPISample.STARTUP_TIMINGS
+        assert {"total", "import_chat_backend", "llm_client", "chat_cache", "user_store"} <= set(timings)
+        assert client.get("/readyz").status_code == 200
+        assert client.get("/api/status").json()["startup"] == {"mode": "eager", "timings_ms": timings}
+    assert FastAPISample._store is None
+
+
+def test_lazy_mode_opens_the_store_but_skips_warm_up(startup):
+    with startup("lazy") as client:
+        store = FastAPISample._store
+        # Schema created and seeded during startup, not inside the first request
+        assert isinstance(store, SQLiteUserStore)
+        assert store._executor is None
+        assert FastAPISample.STARTUP_TIMINGS == {}
+        assert client.get("/readyz").status_code == 200
+        response = client.get("/users/search", params={"query": "alice"})
+        assert response.json()["total"] == 1
+        assert FastAPISample._store is store
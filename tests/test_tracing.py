@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import FastAPISample
+import MCPSample
+import Tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+
+def test_parse_valid_traceparent():
+    assert Tracing.parse_traceparent(TRACEPARENT) == (TRACE_ID, PARENT_ID)
+    assert Tracing.parse_traceparent(f"  {TRACEPARENT.upper()} ") == (TRACE_ID, PARENT_ID)
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "garbage",
+    f"01-{TRACE_ID}-{PARENT_ID}-01",           # unknown version
+    f"00-{'0' * 32}-{PARENT_ID}-01",           # all-zero trace id
+    f"00-{TRACE_ID}-{'0' * 16}-01",            # all-zero parent id
+    f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01",      # short trace id
+    f"00-{TRACE_ID}-{PARENT_ID}-01-extra",
+])
+def test_parse_invalid_traceparent(header):
+    assert Tracing.parse_traceparent(header) is None
+
+
+def test_spans_continue_a_remote_trace_and_nest():
+    with Tracing.span("server", traceparent=TRACEPARENT) as server:
+        with Tracing.span("child") as child:
+            headers = {}
+            Tracing.inject_headers(headers)
+    assert (server.trace_id, server.parent_id) == (TRACE_ID, PARENT_ID)
+    assert (child.trace_id, child.parent_id) == (TRACE_ID, server.span_id)
+    assert headers == {"traceparent": f"00-{TRACE_ID}-{child.span_id}-01"}
+    assert Tracing.current_span() is None
+
+
+def test_invalid_traceparent_starts_a_new_trace():
+    with Tracing.span("server", traceparent="garbage") as server:
+        pass
+    assert server.parent_id is None and len(server.trace_id) == 32
+
+
+def test_no_header_without_a_current_span():
+    headers = {}
+    Tracing.inject_headers(headers)
+    assert headers == {}
+
+
+def test_middleware_continues_the_callers_trace():
+    response = TestClient(FastAPISample.app).get("/users/search", headers={"traceparent": TRACEPARENT})
+    assert response.headers["x-trace-id"] == TRACE_ID
+    spans = {s.name: s for s in Tracing.spans(TRACE_ID)}
+    server = spans["GET /users/search"]
+    assert server.parent_id == PARENT_ID
+    assert spans["search"].parent_id == server.span_id
+
+
+def test_tool_requests_get_a_client_span_and_carry_it():
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("traceparent"))
+        return httpx.Response(200, json={"total": 0, "items": []})
+
+    async def scenario():
+        MCPSample._http_client = httpx.AsyncClient(
+            base_url="http://data-api",
+            transport=httpx.MockTransport(handler),
+            event_hooks={"request": [MCPSample._inject_trace_headers]},
+        )
+        MCPSample._http_client_loop = asyncio.get_running_loop()
+        try:
+            with Tracing.span("chat.turn", traceparent=TRACEPARENT):
+                await MCPSample.search_users_tool(MCPSample.SearchUsersInput(query="a"))
+        finally:
+            await MCPSample.close_http_client()
+
+    asyncio.run(scenario())
+    spans = {s.name: s for s in Tracing.spans(TRACE_ID)}
+    tool_span, client_span = spans["tool.search_users"], spans["data_api GET /users/search"]
+    assert client_span.kind == Tracing.KIND_CLIENT and client_span.parent_id == tool_span.span_id
+    assert client_span.attributes["http.status_code"] == 200
+    # The data API's server span becomes a child of the client span
+    assert seen == [f"00-{TRACE_ID}-{client_span.span_id}-01"]
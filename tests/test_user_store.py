@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from UserStore import InMemoryUserStore, SQLiteUserStore
+
+USERS = [
+    {"id": "u1", "name": "Alice Smith", "email": "alice@example.com", "role": "admin", "created_at": "2024-01-01"},
+    {"id": "u2", "name": "Bob Johnson", "email": "bob@example.com", "role": "member", "created_at": "2024-01-15"},
+    {"id": "u3", "name": "Charlie Brown", "email": "charlie@example.com", "role": "member", "created_at": "2024-02-01"},
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryUserStore([dict(u) for u in USERS])
+        return
+    store = SQLiteUserStore(str(tmp_path / "users.db"), read_connections=2, seed=USERS)
+    yield store
+    asyncio.run(store.close())
+
+
+@pytest.mark.parametrize("query, role, expected", [
+    (None, None, {"admin": 1, "member": 2}),
+    (None, "member", {"member": 2}),
+    (None, "owner", {"owner": 0}),
+    ("o", "owner", {"owner": 0}),
+    ("bob", "admin", {"admin": 0}),
+    ("zzz", "admin", {"admin": 0}),
+    ("zzz", None, {}),
+    ("smith", None, {"admin": 1}),
+])
+def test_count_shape(store, query, role, expected):
+    assert asyncio.run(store.count(query, role)) == expected
+
+
+def test_sqlite_close_releases_every_connection(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / "users.db"), read_connections=2, seed=USERS)
+
+    async def scenario():
+        await store.search("alice", None, 10, 0)
+        await store.close()
+
+    asyncio.run(scenario())
+    assert store._writer is None and store._executor is None
+
+
+def test_fts_index_survives_vacuum(tmp_path):
+    path = str(tmp_path / "users.db")
+    store = SQLiteUserStore(path, read_connections=1)
+    store.load(USERS)
+    # VACUUM only keeps rowids stable when they are an INTEGER PRIMARY KEY column
+    columns = {row["name"]: row["pk"] for row in store._writer.execute("PRAGMA table_info(users)")}
+    assert columns["rowid"] == 1
+    store._writer.execute("DELETE FROM users WHERE id = 'u1'")
+    store._writer.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+    store._writer.execute("VACUUM")
+    assert asyncio.run(store.search("charlie", None, 10, 0))["items"] == [USERS[2]]
+    asyncio.run(store.close())
+
+
+def test_old_schema_is_rebuilt(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "users.db")
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE users (id TEXT NOT NULL UNIQUE, name TEXT NOT NULL, email TEXT NOT NULL,"
+        " role TEXT NOT NULL, created_at TEXT NOT NULL);"
+        "CREATE TABLE store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        "INSERT INTO users VALUES ('old', 'Old User', 'old@example.com', 'member', '2020-01-01');"
+        "INSERT INTO store_meta VALUES ('source', 'old-source');"
+    )
+    db.close()
+    store = SQLiteUserStore(path, read_connections=1, seed=USERS)
+    assert asyncio.run(store.get_by_ids(["old", "u1"])) == {"u1": USERS[0]}
+    assert store.source != "old-source"
+    asyncio.run(store.close())
+
+
+
+def test_search_reports_backend_stages(store):
+    expected = {"memory": {"filter", "paginate"}, "sqlite": {"count", "page"}}[store.name]
+    for query in (None, "al", "alice"):
+        stages = {}
+        asyncio.run(store.search(query, None, 10, 0, stages))
+        assert set(stages) == expected and all(seconds >= 0 for seconds in stages.values())
+
+    summed = {}
+    asyncio.run(store.search_many([("alice", None, 10, 0)] * 3, summed))
+    assert set(summed) == expected
+    # Without a dict nothing is recorded and the result is unchanged
+    assert asyncio.run(store.search("alice", None, 10, 0)) == {"total": 1, "items": [USERS[0]]}
+
+
+def test_memory_store_is_independent_of_the_callers_list():
+    users = [dict(u) for u in USERS]
+    store = InMemoryUserStore(users)
+    users.append({"id": "u9", "name": "Zed", "email": "zed@example.com", "role": "admin", "created_at": "2024-03-01"})
+    assert asyncio.run(store.search("zed", None, 10, 0))["total"] == 0
+    store.load(USERS[:1])
+    assert len(users) == 4
+    assert asyncio.run(store.count(None, None)) == {"admin": 1}
+
+
+# Parity: both backends must answer every search, count and page identically
+EXTRA_USERS = [
+    {"id": "x1", "name": "Zoë 100% O'Brien", "email": "zoe_obrien@example.com", "role": "admin", "created_at": "2026-01-01"},
+    {"id": "x2", "name": 'Quinn "Q" Li', "email": "q.li+tag@company.io", "role": "member", "created_at": "2026-01-02"},
+    {"id": "x3", "name": "Élodie Back\\slash", "email": "ELODIE@EXAMPLE.COM", "role": "owner", "created_at": "2026-01-03"},
+    {"id": "x4", "name": "Ñandú Straße Müller", "email": "nandu@example.com", "role": "viewer", "created_at": "2026-01-04"},
+]
+
+QUERIES = [
+    None, "", "a", "Z", "li", "Sm", "smi", "SMITH", "mar", "son", "example.com", "@gmail", "gmail.com",
+    "zoë", "ZOË", "100%", "%", "_", "e_o", "o'b", "'", '"q"', '"', "élo", "\\", "back\\s", "+tag",
+    "zzzz", "member",
+    # Short non-ASCII queries take the LIKE path, which only folds ASCII case by itself
+    "é", "É", "Ü", "ü", "ñ", "Ñ", "ß", "Mü",
+]
+ROLES = [None, "", "member", "admin", "owner", "viewer", "nobody"]
+PAGES = [(10, 0), (3, 7), (100, 250), (10, 10_000)]
+
+
+@pytest.fixture(scope="module")
+def parity_stores(tmp_path_factory):
+    from benchmarks.dataset import generate_users
+
+    users = list(generate_users(2000, seed=7)) + EXTRA_USERS
+    memory = InMemoryUserStore(users)
+    sqlite = SQLiteUserStore(str(tmp_path_factory.mktemp("parity") / "users.db"), read_connections=2)
+    sqlite.load(users)
+    sqlite.warm_up()
+    yield memory, sqlite
+    asyncio.run(sqlite.close())
+
+
+def both(stores, method, *args):
+    async def call():
+        return [await getattr(store, method)(*args) for store in stores]
+    return asyncio.run(call())
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("role", ROLES)
+def test_search_and_count_parity(parity_stores, query, role):
+    for limit, offset in PAGES:
+        memory, sqlite = both(parity_stores, "search", query, role, limit, offset)
+        assert memory == sqlite, (limit, offset)
+    memory, sqlite = both(parity_stores, "count", query, role)
+    assert memory == sqlite
+
+
+def test_batch_and_size_parity(parity_stores):
+    searches = [(q, r, 5, 3) for q in QUERIES[:8] for r in ROLES[:4]]
+    memory, sqlite = both(parity_stores, "search_many", searches)
+    assert memory == sqlite
+    ids = ["u1", "u2000", "x3", "missing"]
+    memory, sqlite = both(parity_stores, "get_by_ids", ids)
+    assert memory == sqlite
+    assert both(parity_stores, "size") == [2004, 2004]